@@ -28,6 +28,14 @@ def sqlite_engine_connect(dbapi_connection, connection_record):
 
     dbapi_connection.create_function("REGEXP", 2, regexp)
 
+    # WAL: each commit appends to the log with a single sync instead of going
+    # through a rollback journal, and the bot and API processes can keep
+    # reading while the other writes
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .db import Base
@@ -15,6 +15,7 @@ class User(Base):
 
     configuration = relationship("UserConfiguration", back_populates="user", uselist=False, cascade="all, delete-orphan")
     transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
+    learned_categories = relationship("LearnedCategory", back_populates="user", cascade="all, delete-orphan")
 
 class UserConfiguration(Base):
     __tablename__ = "user_configurations"
@@ -48,3 +49,17 @@ class Transaction(Base):
     status = Column(String, nullable=True)
 
     user = relationship("User", back_populates="transactions")
+
+class LearnedCategory(Base):
+    """Category the LLM chose for a merchant/recipient, reused instead of asking again."""
+    __tablename__ = "learned_categories"
+    __table_args__ = (UniqueConstraint("user_id", "merchant", "income"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    merchant = Column(String, nullable=False)  # lowercased parsed description
+    income = Column(Boolean, nullable=False)
+    category = Column(String, nullable=False)
+
+    user = relationship("User", back_populates="learned_categories")
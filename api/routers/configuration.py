@@ -134,15 +134,14 @@ async def add_tracking_item(
     item: TrackingItemCreate,
     current_user: User = Depends(get_current_user)
 ):
-    config = storage.get_user_config(current_user)
-    items = config.get("tracking_items", [])
-    
-    new_item = item.model_dump()
-    new_item["id"] = str(uuid.uuid4())
-    items.append(new_item)
-    
-    config["tracking_items"] = items
-    storage.save_user_config(current_user, config)
+    with storage.edit_config(current_user) as config:
+        items = config.get("tracking_items", [])
+
+        new_item = item.model_dump()
+        new_item["id"] = str(uuid.uuid4())
+        items.append(new_item)
+
+        config["tracking_items"] = items
     return new_item
 
 @router.put("/tracking/{item_id}", response_model=TrackingItem)
@@ -151,27 +150,26 @@ async def update_tracking_item(
     item: TrackingItemCreate,
     current_user: User = Depends(get_current_user)
 ):
-    config = storage.get_user_config(current_user)
-    items = config.get("tracking_items", [])
-    
-    found = False
-    updated_items = []
-    updated_item_data = {}
-    
-    for existing in items:
-        if existing["id"] == item_id:
-            updated_item_data = item.model_dump()
-            updated_item_data["id"] = item_id
-            updated_items.append(updated_item_data)
-            found = True
-        else:
-            updated_items.append(existing)
-            
-    if not found:
-        raise HTTPException(status_code=404, detail="Tracking item not found")
-        
-    config["tracking_items"] = updated_items
-    storage.save_user_config(current_user, config)
+    with storage.edit_config(current_user) as config:
+        items = config.get("tracking_items", [])
+
+        found = False
+        updated_items = []
+        updated_item_data = {}
+
+        for existing in items:
+            if existing["id"] == item_id:
+                updated_item_data = item.model_dump()
+                updated_item_data["id"] = item_id
+                updated_items.append(updated_item_data)
+                found = True
+            else:
+                updated_items.append(existing)
+
+        if not found:
+            raise HTTPException(status_code=404, detail="Tracking item not found")
+
+        config["tracking_items"] = updated_items
     return updated_item_data
 
 @router.delete("/tracking/{item_id}")
@@ -179,14 +177,13 @@ async def delete_tracking_item(
     item_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    config = storage.get_user_config(current_user)
-    items = config.get("tracking_items", [])
-    
-    filtered = [i for i in items if i["id"] != item_id]
-    
-    if len(filtered) == len(items):
-        raise HTTPException(status_code=404, detail="Tracking item not found")
-        
-    config["tracking_items"] = filtered
-    storage.save_user_config(current_user, config)
+    with storage.edit_config(current_user) as config:
+        items = config.get("tracking_items", [])
+
+        filtered = [i for i in items if i["id"] != item_id]
+
+        if len(filtered) == len(items):
+            raise HTTPException(status_code=404, detail="Tracking item not found")
+
+        config["tracking_items"] = filtered
     return {"message": "Deleted"}
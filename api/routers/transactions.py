@@ -15,6 +15,7 @@ from api.schemas import (
     TransactionUpdate
 )
 from src.parser import TransactionParser
+from src.learned_rules import LearnedRules, merchant_key
 from src.storage import StorageManager, FIELDNAMES
 from src.models import TransactionData
 from src.config import TRANSACTION_TYPES
@@ -125,7 +126,8 @@ async def parse_transaction(
         data,
         categories_list=categories,
         keywords_map=keywords,
-        api_key=api_key
+        api_key=api_key,
+        learned_rules=LearnedRules(storage, current_user)
     )
 
     if not transaction_data:
@@ -232,6 +234,12 @@ async def update_transaction(
         tx.account = update_data.account
         
     storage.save_transaction(tx, current_user)
+
+    # A user-chosen category confirms the rule for this merchant, replacing a
+    # provisional LLM answer so later messages from it get the corrected category
+    merchant = merchant_key(tx.description)
+    if update_data.category is not None and merchant is not None:
+        LearnedRules(storage, current_user).record(merchant, tx.amount > 0, tx.category)
     
     return TransactionResponse(
         id=tx.id,
@@ -277,24 +285,15 @@ async def export_transactions(
         txs = query.all()
 
         output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=FIELDNAMES)
-        writer.writeheader()
+        writer = csv.writer(output)
+        writer.writerow(FIELDNAMES)
         
-        for t in txs:
-            # Match schema with CSV fields
-            row = {
-                "id": t.id,
-                "timestamp": t.timestamp.isoformat(),
-                "bank": t.bank,
-                "type": t.type,
-                "amount": t.amount,
-                "description": t.description,
-                "account": t.account,
-                "category": t.category,
-                "raw_message": t.raw_message,
-                "status": t.status
-            }
-            writer.writerow(row)
+        # Rows in FIELDNAMES order, written in one batch
+        writer.writerows(
+            (t.id, t.timestamp.isoformat(), t.bank, t.type, t.amount,
+             t.description, t.account, t.category, t.raw_message, t.status)
+            for t in txs
+        )
 
         output.seek(0)
         
@@ -513,26 +512,28 @@ async def import_transactions(
 
     # If we have new categories and create_new_categories is True, update config
     if create_new_categories and new_categories_detected:
-        current_cats = config.get("categories", [])
-        current_keywords = config.get("keywords", {})
-        
-        for new_cat in new_categories_detected:
-            # Add to categories if not exists (case insensitive check done above)
-            # Find if strictly in list
-            if new_cat not in current_cats:
-                 # Prefer Capitalized if possible? Let's just use what was in CSV
-                 # Spec says: "convert all categories to lower case" in Validation section.
-                 # So we save lowercase.
-                 new_cat_lower = new_cat.lower()
-                 if new_cat_lower not in [c.lower() for c in current_cats]:
-                     current_cats.append(new_cat_lower)
-                     # Add keyword
-                     if new_cat_lower not in current_keywords:
-                         current_keywords[new_cat_lower] = [new_cat_lower]
-        
-        config["categories"] = current_cats
-        config["keywords"] = current_keywords
-        storage.save_user_config(current_user, config)
+        # Merge into a fresh read of the config and write it in the same session,
+        # so a config edit made while the file was being validated is kept
+        with storage.edit_config(current_user) as config:
+            current_cats = config.get("categories", [])
+            current_keywords = config.get("keywords", {})
+
+            for new_cat in new_categories_detected:
+                # Add to categories if not exists (case insensitive check done above)
+                # Find if strictly in list
+                if new_cat not in current_cats:
+                     # Prefer Capitalized if possible? Let's just use what was in CSV
+                     # Spec says: "convert all categories to lower case" in Validation section.
+                     # So we save lowercase.
+                     new_cat_lower = new_cat.lower()
+                     if new_cat_lower not in [c.lower() for c in current_cats]:
+                         current_cats.append(new_cat_lower)
+                         # Add keyword
+                         if new_cat_lower not in current_keywords:
+                             current_keywords[new_cat_lower] = [new_cat_lower]
+
+            config["categories"] = current_cats
+            config["keywords"] = current_keywords
         
         # Re-validate previously valid rows that might have had these categories? 
         # Logic above: if create_new_categories is True, we skipped the error. 
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
 from datetime import datetime
 from collections import defaultdict
 from src.config import BIG_TICKET_THRESHOLD, DEFAULT_BUDGETS
@@ -36,23 +36,66 @@ class AnalyticsEngine:
                 breakdown[key] += t.amount
         return dict(breakdown)
 
+    def summarize(self) -> Dict[str, Any]:
+        """
+        Single pass computing get_total_income_expense() together with the
+        category and account breakdowns.
+        """
+        income = expense = disbursements = 0.0
+        category_breakdown = defaultdict(float)
+        account_breakdown = defaultdict(float)
+        for t in self.transactions:
+            amount = t.amount
+            is_disbursement = t.category == "disbursement"
+            if is_disbursement:
+                disbursements += amount
+            elif amount > 0:
+                income += amount
+            elif amount < 0:
+                expense += amount
+
+            if amount < 0 or (amount > 0 and is_disbursement):
+                category_breakdown[t.category] += amount
+                key = f"{t.bank or 'Unknown'} {t.account or 'Unknown'} ({t.type or 'Unknown'})"
+                account_breakdown[key] += amount
+
+        return {
+            "income": income,
+            "expense": expense,
+            "disbursed_expense": expense + disbursements,
+            "category_breakdown": dict(category_breakdown),
+            "account_breakdown": dict(account_breakdown),
+        }
+
     def get_big_ticket_expenses(self, threshold: float = BIG_TICKET_THRESHOLD) -> List[TransactionData]:
         return [t for t in self.transactions if t.amount < 0 and abs(t.amount) >= threshold]
 
     def check_budget_alerts(self, current_month_transactions: List[TransactionData], budgets: Optional[Dict[str, float]] = None) -> List[str]:
-        if budgets is None:
-            budgets = DEFAULT_BUDGETS
+        category_spend = self.get_category_spend((t.category, t.amount) for t in current_month_transactions)
+        return self.check_budget_alerts_from_totals(category_spend, budgets)
 
+    @staticmethod
+    def get_category_spend(category_amounts: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+        """
+        Aggregates (category, amount) pairs into the per-category spend used
+        for budget alerts, including the overall "Total".
+        """
         category_spend = defaultdict(float)
         category_spend["Total"] = 0.0
-        for t in current_month_transactions:
-            if t.amount < 0:
-                category_spend[t.category] += abs(t.amount)
-                category_spend["Total"] += abs(t.amount)
-            elif t.amount > 0 and t.category == "disbursement":
-                category_spend[t.category] += t.amount # Refunds reduce expense
+        for category, amount in category_amounts:
+            if amount < 0:
+                category_spend[category] += abs(amount)
+                category_spend["Total"] += abs(amount)
+            elif amount > 0 and category == "disbursement":
+                category_spend[category] += amount # Refunds reduce expense
         category_spend["Total"] -= category_spend["disbursement"] # Adjust total for disbursements
-        
+        return category_spend
+
+    @staticmethod
+    def check_budget_alerts_from_totals(category_spend: Dict[str, float], budgets: Optional[Dict[str, float]] = None) -> List[str]:
+        if budgets is None:
+            budgets = DEFAULT_BUDGETS
+
         total_budget = budgets.get('Total', 0)
         if total_budget > 0:
             total_expenses_str = f"${category_spend['Total']:.2f} / ${total_budget:.2f}"
@@ -92,8 +135,9 @@ class AnalyticsEngine:
         for t in self.transactions:
             if t.amount < 0:
                 try:
-                    dt = datetime.fromisoformat(t.timestamp)
-                    breakdown[dt.day] += abs(t.amount)
+                    dt = t.timestamp_dt
                 except ValueError:
                     continue
+                if dt is not None:
+                    breakdown[dt.day] += abs(t.amount)
         return dict(breakdown)
@@ -1,18 +1,53 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Optional, Tuple
+import re
+from typing import Any, Dict, List, Optional, Tuple
 from dateutil import tz
-from dateutil import parser as date_parser
 import uuid
-from src.models import TransactionData
+from src.models import TransactionData, parse_iso_timestamp
 from src.config import TRANSACTION_TYPES
 
+# Matches the opening of a named group, e.g. "(?P<amount>"
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+
+def build_pattern_set(patterns: List[Dict[str, Any]]) -> re.Pattern:
+    """
+    Compiles all of a bank's patterns into one alternation, so a single scan
+    tells which pattern (if any) matches. Named groups are made non-capturing;
+    each alternative is wrapped in a group named by its index.
+    """
+    alternatives = (
+        f"(?P<_p{i}>{_NAMED_GROUP.sub('(?:', pattern['regex'].pattern)})"
+        for i, pattern in enumerate(patterns)
+    )
+    return re.compile("|".join(alternatives))
+
+SGT = tz.gettz("Asia/Singapore")
+
 class BaseBankParser(ABC):
 
     TIME_PARSE_WARNING = "TIME_PARSE_WARNING"
 
     transaction_types = TRANSACTION_TYPES
 
+    patterns: List[Dict[str, Any]] = []
+    _pattern_set: Optional[re.Pattern] = None
+
+    def match_pattern(self, text: str) -> Optional[Tuple[Dict[str, Any], re.Match]]:
+        """
+        Finds the pattern matching the text with one scan over the combined
+        pattern set, then extracts named groups with that pattern only.
+        Returns (pattern, match) or None.
+        """
+        if self._pattern_set is None:
+            self._pattern_set = build_pattern_set(self.patterns)
+
+        hit = self._pattern_set.search(text)
+        if not hit:
+            return None
+        pattern = self.patterns[int(hit.lastgroup[2:])]
+        return pattern, pattern["regex"].match(text, hit.start())
+
     @abstractmethod
     def rule_parse(self, text: str) -> Optional[TransactionData]:
         """
@@ -21,20 +56,22 @@ class BaseBankParser(ABC):
         """
         pass
 
-    def llm_parse(self, text: str, api_key: Optional[str] = None) -> Tuple[Optional[TransactionData], Optional[str]]:
+    def llm_parse(self, text: str, api_key: Optional[str] = None, categories_list: Optional[List[str]] = None, remarks: Optional[str] = None) -> Tuple[Optional[TransactionData], Optional[str]]:
         """
         Placeholder for LLM-based parsing method.
         This can be implemented in subclasses if needed.
+        If categories_list is given, the category is chosen in the same LLM call
+        and set on the result when it is one of those categories.
         """
         from src.llm_helper import llm_parse_bank_message
-        parsed_dict, error = llm_parse_bank_message(text, self.transaction_types, api_key=api_key)
-
-        # transaction id
-        transaction_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"{datetime.now()}|{text}"))
+        parsed_dict, error = llm_parse_bank_message(text, self.transaction_types, api_key=api_key, categories_list=categories_list, remarks=remarks)
 
         if error or not parsed_dict:
             return None, error
 
+        # transaction id (random; the old clock-seeded uuid5 was never reproducible)
+        transaction_id = str(uuid.uuid4())
+
         # Convert dict to TransactionData
         try:
             # llm_parse_bank_message returns dict with keys: type, amount, description, account, timestamp
@@ -47,17 +84,19 @@ class BaseBankParser(ABC):
             # but the model has bank: str.
             # I will set it to "Generic" or "LLM" for now, and let TransactionParser override it.
 
-            timestamp = datetime.now(tz=tz.gettz("Asia/Singapore")).isoformat()
+            timestamp = None
             if "timestamp" in parsed_dict:
                 try:
                     # Validate and parse timestamp
-                    dt = date_parser.isoparse(parsed_dict["timestamp"])
+                    dt = parse_iso_timestamp(parsed_dict["timestamp"])
                     timestamp = dt.isoformat()
                 except Exception:
-                    # If timestamp parsing fails, silently fall back to the pre-set default timestamp.
+                    # If timestamp parsing fails, silently fall back to the current time below.
                     pass
-            else:
-                parsed_dict["timestamp"] = timestamp
+            if timestamp is None:
+                # The clock is only read when there is no usable timestamp
+                timestamp = datetime.now(tz=SGT).isoformat()
+                parsed_dict.setdefault("timestamp", timestamp)
 
             data = TransactionData(
                 id=transaction_id,
@@ -68,6 +107,8 @@ class BaseBankParser(ABC):
                 account=parsed_dict.get("account", "Unknown"),
                 timestamp=timestamp,
             )
+            if categories_list and parsed_dict.get("category") in categories_list:
+                data.category = parsed_dict["category"]
             return data, None
         except Exception as e:
             return None, f"Failed to convert LLM output to TransactionData: {e}"
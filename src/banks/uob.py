@@ -4,113 +4,119 @@ import re
 from typing import Optional
 import uuid
 from dateutil import parser as date_parser
-from dateutil import tz
-from .base import BaseBankParser
+from .base import BaseBankParser, SGT, build_pattern_set
 from src.models import TransactionData
 
 logger = logging.getLogger(__name__)
 
+_TZINFOS = {"SGT": SGT}
+
+_TYPE_MAPPING = {
+    "NETS QR payment": "NETS QR",
+    "one-time transfer": "Transfer",
+    "fund transfer": "Transfer",
+    "fund transfer(s)": "Transfer",
+    "PayNow transfer": "PayNow",
+    "PayNow": "PayNow",
+    "Card": "Card",
+    "card": "Card",
+}
+
+# Validate once at import that all mapped types are known transaction types
+for _std_type in _TYPE_MAPPING.values():
+    if _std_type not in BaseBankParser.transaction_types:
+        raise ValueError(f"Unknown transaction type mapping: {_std_type}")
+
 class UOBParser(BaseBankParser):
-    def __init__(self):
-        self.patterns = [
-            {
-                "regex": re.compile(r"You made a (?P<method>.+?) of SGD (?P<amount>[\d\.,]+) to (?P<recipient>.+?) on your a/c ending (?P<account>\d+) at (?P<datetime_str>.+?)\. If unauthorised"),
-                "sign": -1
-            },
-            {
-                "regex": re.compile(r"You made a (?P<method>.+?) of SGD (?P<amount>[\d\.,]+) to (?P<recipient>.+?) at (?P<datetime_str>.+?), on your a/c ending (?P<account>\d+)\. If unauthorised"),
-                "sign": -1
-            },
-            {
-                "regex": re.compile(r"You have received SGD (?P<amount>[\d\.,]+) in your (?P<method>PayNow)-linked account ending (?P<account>\d+) on (?P<datetime_str>.+?)\."),
-                "sign": 1
-            },
-            {
-                "regex": re.compile(r"A transaction of SGD (?P<amount>[\d\.,]+) was made with your UOB (?P<method>[Cc]ard) ending (?P<account>\d+) on (?P<date_str>.+?) at (?P<recipient>.+?)\. If unauthorised"),
-                "sign": -1
-            },
-            {
-                "regex": re.compile(r"UOB Instalment Payment Plan: Your monthly instalment of SGD (?P<amount>[\d\.,]+) has been billed to your UOB (?P<method>[Cc]ard) ending (?P<account>\d+) on (?P<date_str>.+?)"),
-                "sign": -1
-            }
-        ]
-        
-        self.type_mapping = {
-            "NETS QR payment": "NETS QR",
-            "one-time transfer": "Transfer",
-            "fund transfer": "Transfer",
-            "fund transfer(s)": "Transfer",
-            "PayNow transfer": "PayNow",
-            "PayNow": "PayNow",
-            "Card": "Card",
-            "card": "Card",
+    patterns = [
+        {
+            "regex": re.compile(r"You made a (?P<method>.+?) of SGD (?P<amount>[\d\.,]+) to (?P<recipient>.+?) on your a/c ending (?P<account>\d+) at (?P<datetime_str>.+?)\. If unauthorised"),
+            "sign": -1
+        },
+        {
+            "regex": re.compile(r"You made a (?P<method>.+?) of SGD (?P<amount>[\d\.,]+) to (?P<recipient>.+?) at (?P<datetime_str>.+?), on your a/c ending (?P<account>\d+)\. If unauthorised"),
+            "sign": -1
+        },
+        {
+            "regex": re.compile(r"You have received SGD (?P<amount>[\d\.,]+) in your (?P<method>PayNow)-linked account ending (?P<account>\d+) on (?P<datetime_str>.+?)\."),
+            "sign": 1
+        },
+        {
+            "regex": re.compile(r"A transaction of SGD (?P<amount>[\d\.,]+) was made with your UOB (?P<method>[Cc]ard) ending (?P<account>\d+) on (?P<date_str>.+?) at (?P<recipient>.+?)\. If unauthorised"),
+            "sign": -1
+        },
+        {
+            "regex": re.compile(r"UOB Instalment Payment Plan: Your monthly instalment of SGD (?P<amount>[\d\.,]+) has been billed to your UOB (?P<method>[Cc]ard) ending (?P<account>\d+) on (?P<date_str>.+?)"),
+            "sign": -1
         }
+    ]
+    _pattern_set = build_pattern_set(patterns)
 
-        # Validate that all mapped types are known transaction types
-        for type in self.type_mapping.values():
-            if type not in self.transaction_types:
-                raise ValueError(f"Unknown transaction type mapping: {type}")
+    type_mapping = _TYPE_MAPPING
 
     def rule_parse(self, text: str) -> Optional[TransactionData]:
-        for pattern in self.patterns:
-            match = pattern["regex"].search(text)
-            if match:
-                data = match.groupdict()
+        matched = self.match_pattern(text)
+        if not matched:
+            return None
+
+        pattern, match = matched
+        # Optional groups are not defined in every pattern
+        group_names = match.re.groupindex
+        datetime_str = match["datetime_str"] if "datetime_str" in group_names else None
+        date_str = match["date_str"] if "date_str" in group_names else None
 
-                # transaction id
-                transaction_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"{datetime.now()}|{text}"))
-                
-                # Determine raw type
-                raw_type: str = data.get("method")
-                
-                # Map to standardized type
-                # If exact match not found, try partial match or default to raw_type
-                std_type = self.type_mapping.get(raw_type, raw_type)
-                
-                # If raw_type is not in mapping, try to see if any key is part of raw_type
-                if raw_type not in self.type_mapping:
-                    for key, val in self.type_mapping.items():
-                        if key in raw_type:
-                            std_type = val
-                            break
+        # transaction id (random; the old clock-seeded uuid5 was never reproducible)
+        transaction_id = str(uuid.uuid4())
+        
+        # Determine raw type
+        raw_type: str = match["method"]
+        
+        # Map to standardized type
+        # If exact match not found, try partial match or default to raw_type
+        std_type = self.type_mapping.get(raw_type)
+        if std_type is None:
+            # First key in mapping order contained in raw_type
+            std_type = raw_type
+            for key, val in self.type_mapping.items():
+                if key in raw_type:
+                    std_type = val
+                    break
 
-                # Amount
-                sign = int(pattern["sign"])
-                amount = float(data["amount"].replace(',', '')) * sign
-                
-                # Description
-                description = data.get("recipient") or "Unknown"
-                
-                # Timestamp parsing
-                status = None
-                timestamp = datetime.now(tz=tz.gettz("Asia/Singapore")).isoformat()
-                if data.get("datetime_str"):
-                    try:
-                        dt_str = data["datetime_str"].replace(" at ", " ")
-                        tzinfos = {"SGT": tz.gettz("Asia/Singapore")}
-                        timestamp = date_parser.parse(dt_str, fuzzy=True, tzinfos=tzinfos, dayfirst=True).isoformat()
-                    except Exception:
-                        logger.error(f"Failed to parse datetime_str: {data['datetime_str']}")
-                        return None
-                elif data.get("date_str"):
-                    try:
-                        dt_str = data["date_str"]
-                        tzinfos = {"SGT": tz.gettz("Asia/Singapore")}
-                        timestamp_raw = date_parser.parse(dt_str, fuzzy=True, tzinfos=tzinfos, dayfirst=True)
-                        timestamp = timestamp_raw.astimezone(tz.gettz("Asia/Singapore")).isoformat()
-                        status = self.TIME_PARSE_WARNING + ": Time info missing, used date only"
-                    except Exception:
-                        logger.error(f"Failed to parse date_str: {data['date_str']}")
-                        pass
-                
-                return TransactionData(
-                    id=transaction_id,
-                    type=std_type,
-                    amount=amount,
-                    description=description,
-                    account=str(data.get("account")),
-                    timestamp=timestamp,
-                    bank="UOB",
-                    status=status
-                )
-        return None
+        # Amount
+        sign = int(pattern["sign"])
+        amount = float(match["amount"].replace(',', '')) * sign
+        
+        # Description
+        description = (match["recipient"] if "recipient" in group_names else None) or "Unknown"
+        
+        # Timestamp parsing
+        status = None
+        timestamp = None
+        if datetime_str:
+            try:
+                dt_str = datetime_str.replace(" at ", " ") if " at " in datetime_str else datetime_str
+                timestamp = date_parser.parse(dt_str, fuzzy=True, tzinfos=_TZINFOS, dayfirst=True).isoformat()
+            except Exception:
+                logger.error(f"Failed to parse datetime_str: {datetime_str}")
+                return None
+        elif date_str:
+            try:
+                timestamp_raw = date_parser.parse(date_str, fuzzy=True, tzinfos=_TZINFOS, dayfirst=True)
+                timestamp = timestamp_raw.astimezone(SGT).isoformat()
+                status = self.TIME_PARSE_WARNING + ": Time info missing, used date only"
+            except Exception:
+                logger.error(f"Failed to parse date_str: {date_str}")
+        if timestamp is None:
+            # The clock is only read when the message has no usable date
+            timestamp = datetime.now(tz=SGT).isoformat()
+        
+        return TransactionData(
+            id=transaction_id,
+            type=std_type,
+            amount=amount,
+            description=description,
+            account=match["account"],
+            timestamp=timestamp,
+            bank="UOB",
+            status=status
+        )
@@ -1,22 +1,63 @@
+import asyncio
 import logging
 import csv
-import tempfile
-import os
 from telegram import Update, BotCommand, BotCommandScopeDefault, BotCommandScopeChat, BotCommandScopeChatMember
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters, Application
-from src.config import DEFAULT_CATEGORIES, TELEGRAM_BOT_TOKEN, ALLOWED_USER_IDS, START_KEY
+from src.config import DEFAULT_CATEGORIES, TELEGRAM_BOT_TOKEN, ALLOWED_USER_IDS, START_KEY, MAX_CONCURRENT_UPDATES
 from src.parser import TransactionParser
 from src.storage import StorageManager, FIELDNAMES
 from src.analytics import AnalyticsEngine
+from src.learned_rules import LearnedRules
+from src.utils import add_allowed_user
 from datetime import datetime
 import calendar
+from functools import wraps
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
+# Reply sent by handle_message after a transaction is saved (HTML parse mode)
+_SAVED_REPLY_TEMPLATE = (
+    "✅ Transaction Saved!\n"
+    "<b>ID</b>: <code>{id}</code>\n"
+    "<b>Bank</b>: {bank}\n"
+    "<b>Type</b>: {type}\n"
+    "<b>Time</b>: {time}\n"
+    "<b>Amount</b>: SGD {amount:.2f}\n"
+    "<b>Category</b>: {category}\n"
+    "<b>Description</b>: <blockquote expandable>{description}</blockquote>\n"
+)
+
+def _month_start(year: int, month: int) -> datetime:
+    """
+    First day of the month requested in command arguments. Raises ValueError for an
+    invalid month or a year outside 1900-2999, the range the web stats routes accept.
+    """
+    if not 1900 <= year <= 2999:
+        raise ValueError(f"year {year} is out of range")
+    return datetime(year, month, 1)
+
+def authorized(handler):
+    """
+    Decorates a FinanceBot handler so it only runs for allowed users.
+    The caller's user ID is passed to the handler as `user_id`.
+    """
+    @wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user_id = update.effective_user.id
+        if user_id not in ALLOWED_USER_IDS:
+            logger.warning("Unauthorized access attempt from user ID: %s", user_id)
+            return
+        return await handler(self, update, context, user_id)
+    return wrapper
+
 class FinanceBot:
     def __init__(self):
         self.parser = TransactionParser()
         self.storage = StorageManager()
+        # Chats whose command menu was set by this process; a restart (and so
+        # any change to self.commands) makes each chat get it set again
+        self._commands_set: set[int] = set()
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
@@ -28,91 +69,94 @@ class FinanceBot:
              await update.message.reply_text("Finance Tracker Bot Started. Send me your transaction messages!")
         elif START_KEY and context.args and context.args[0] == START_KEY:
             # Check for start key
-            from src.utils import add_allowed_user
             if add_allowed_user(user_id):
                 self.storage.initialize_user_config(user_id)
                 await update.message.reply_text("✅ Access Granted! You are now authorized to use this bot.")
-                logger.info(f"User {user_id} authorized via start key.")
+                logger.info("User %s authorized via start key.", user_id)
             else:
                 await update.message.reply_text("You are already authorized.")
         else:
             # Unauthorized access
-            logger.warning(f"Unauthorized access attempt from user ID: {user_id}")
+            logger.warning("Unauthorized access attempt from user ID: %s", user_id)
             await update.message.reply_text("⛔ Unauthorized access.")
             return
         
-        # Only refresh commands for authorized users
+        # Only refresh commands for authorized users, once per chat
+        if user_id in self._commands_set:
+            return
         await context.bot.delete_my_commands(scope=BotCommandScopeChat(user_id))
         await context.bot.set_my_commands(self.commands, scope=BotCommandScopeChat(user_id))
+        self._commands_set.add(user_id)
 
-    async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if not update.message or not update.message.text:
             return
 
         message_text = update.message.text if update.message and update.message.text else ""
-        logger.debug(f"Received message: {message_text} from user ID: {user_id}")
+        logger.debug("Received message: %s from user ID: %s", message_text, user_id)
 
-        user_categories = self.storage.get_user_categories(user_id)
-        user_keywords = self.storage.get_user_keywords(user_id)
-        parsed_data, err_msg = self.parser.parse_message(message_text, user_categories, user_keywords)
+        # Read the config once; it supplies categories, keywords and budgets below
+        user_config = self.storage.get_user_config(user_id)
+        # Parsing may fall back to an LLM call; run it off the event loop
+        parsed_data, err_msg = await asyncio.to_thread(
+            self.parser.parse_message, message_text, user_config.get("categories"), user_config.get("keywords"),
+            learned_rules=LearnedRules(self.storage, user_id)
+        )
         
         if parsed_data:
             self.storage.save_transaction(parsed_data, user_id)
             
-            # Check for budget alerts
-            transactions = self.storage.get_transactions(user_id=user_id)
-            analytics = AnalyticsEngine(transactions)
-            now = datetime.now()
-            month_txs = analytics.filter_transactions_by_month(now.year, now.month)
-            
-            user_config = self.storage.get_user_config(user_id)
             budgets = user_config.get("budgets", {})
             big_ticket_threshold = user_config["big_ticket_threshold"]
 
-            alerts = analytics.check_budget_alerts(month_txs, budgets)
+            # Check for budget alerts from the current month's per-category totals; skipped without budgets
+            alerts = []
+            if budgets:
+                now = datetime.now()
+                category_spend = AnalyticsEngine.get_category_spend(
+                    self.storage.get_category_amounts(user_id, now.year, now.month)
+                )
+                alerts = AnalyticsEngine.check_budget_alerts_from_totals(category_spend, budgets)
             
             # Access attributes of TransactionData
             if parsed_data.type != 'Income' and abs(parsed_data.amount) >= big_ticket_threshold:
                 alerts.append(f"🔥 Big Ticket Alert: SGD {abs(parsed_data.amount):.2f} >= SGD {big_ticket_threshold:.2f}")
 
-            response = (
-                f"✅ Transaction Saved!\n"
-                f"<b>ID</b>: <code>{parsed_data.id}</code>\n"
-                f"<b>Bank</b>: {parsed_data.bank}\n"
-                f"<b>Type</b>: {parsed_data.type}\n"
-                f"<b>Time</b>: {datetime.fromisoformat(parsed_data.timestamp).strftime('%y/%m/%d %H:%M')}\n"
-                f"<b>Amount</b>: SGD {parsed_data.amount:.2f}\n"
-                f"<b>Category</b>: {parsed_data.category.capitalize()}\n"
-                f"<b>Description</b>: <blockquote expandable>{parsed_data.description}</blockquote>\n"
+            response = _SAVED_REPLY_TEMPLATE.format(
+                id=parsed_data.id,
+                bank=parsed_data.bank,
+                type=parsed_data.type,
+                time=parsed_data.timestamp_dt.strftime('%y/%m/%d %H:%M'),
+                amount=parsed_data.amount,
+                category=parsed_data.category.capitalize(),
+                description=parsed_data.description,
             )
             
             if alerts:
                 response += "\n" + "\n".join(alerts)
+            if err_msg:
+                response += f"\n\nWarning: {err_msg}"
                 
             await update.message.reply_text(response, parse_mode='HTML')
-            if err_msg:
-                await update.message.reply_text(f"Warning: {err_msg}", parse_mode='HTML')
         else:
-            await update.message.reply_text("❌ Could not parse message. Ensure format is correct.")
-            await update.message.reply_text("Correct format is __bank_message__(paynow/card),__timestamp__,__remarks__")
+            response = (
+                "❌ Could not parse message. Ensure format is correct.\n"
+                "Correct format is __bank_message__(paynow/card),__timestamp__,__remarks__"
+            )
             if err_msg:
-                await update.message.reply_text(err_msg, parse_mode='HTML')
-
-    async def add_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
+                response += "\n\n" + err_msg
+            await update.message.reply_text(response, parse_mode='HTML')
 
+    @authorized
+    async def add_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if not context.args:
             await update.message.reply_text("❌ Usage: /add_cat <category1>, <category2>, ...")
             return
 
         categories_str = " ".join(context.args)
-        categories = [c.strip().lower() for c in categories_str.split(",") if c.strip()]
+        # Ordered and de-duplicated, so a repeated name is handled once
+        categories = list(dict.fromkeys(c.strip().lower() for c in categories_str.split(",") if c.strip()))
         
         if not categories:
             await update.message.reply_text("❌ No valid categories provided.")
@@ -131,17 +175,15 @@ class FinanceBot:
 
         await update.message.reply_text(msg)
 
-    async def delete_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def delete_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if not context.args:
             await update.message.reply_text("❌ Usage: /delete_cat <category1>, <category2>, ...")
             return
 
         categories_str = " ".join(context.args)
-        categories = [c.strip().lower() for c in categories_str.split(",") if c.strip()]
+        # Ordered and de-duplicated, so a repeated name is handled once
+        categories = list(dict.fromkeys(c.strip().lower() for c in categories_str.split(",") if c.strip()))
         
         if not categories:
             await update.message.reply_text("❌ No valid categories provided.")
@@ -160,34 +202,24 @@ class FinanceBot:
 
         await update.message.reply_text(msg)
     
-    async def reset_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def reset_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         self.storage.reset_user_categories(user_id)
         await update.message.reply_text("✅ Categories reset to default.")
 
-    async def view_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def view_category_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         categories = self.storage.get_user_categories(user_id)
         if not categories:
              await update.message.reply_text("No categories found.")
              return
 
-        response = "📂 **Current Categories**\n"
-        for cat in categories:
-            response += f"- {cat.capitalize()}\n"
+        response = "📂 **Current Categories**\n" + "".join(f"- {cat.capitalize()}\n" for cat in categories)
         
         await update.message.reply_text(response, parse_mode='Markdown')
 
-    async def view_keywords_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id: return
-
+    @authorized
+    async def view_keywords_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if not context.args:
             await update.message.reply_text("❌ Usage: /viewkeys <category>/'all'")
             return
@@ -197,9 +229,9 @@ class FinanceBot:
         
         response = ""
         if target == 'all':
-            response = "🔑 <b>All Keywords:</b>\n"
-            for cat, keys in keywords_map.items():
-                response += f"<b>{cat.capitalize()}</b>: {', '.join(keys)}\n"
+            response = "🔑 <b>All Keywords:</b>\n" + "".join(
+                f"<b>{cat.capitalize()}</b>: {', '.join(keys)}\n" for cat, keys in keywords_map.items()
+            )
         else:
             # Search case insensitive
             found = False
@@ -214,10 +246,8 @@ class FinanceBot:
         
         await update.message.reply_text(response, parse_mode='HTML')
 
-    async def add_keyword_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id: return
-
+    @authorized
+    async def add_keyword_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if not context.args or len(context.args) < 2:
             await update.message.reply_text("❌ Usage: /addkey <category> <key1, key2...>")
             return
@@ -241,10 +271,8 @@ class FinanceBot:
         except ValueError as e:
             await update.message.reply_text(f"❌ {e}")
 
-    async def del_keyword_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id: return
-
+    @authorized
+    async def del_keyword_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if not context.args or len(context.args) < 2:
             await update.message.reply_text("❌ Usage: /delkey <category> <key1, key2...>")
             return
@@ -268,76 +296,67 @@ class FinanceBot:
         except ValueError as e:
             await update.message.reply_text(f"❌ {e}")
 
-    async def set_budget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
-        if not context.args or len(context.args) != 2:
+    @authorized
+    async def set_budget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+        try:
+            category, amount_arg = context.args
+        except ValueError:
             await update.message.reply_text("❌ Usage: /setbudget <category>/'threshold' <amount>")
             return
-        
-        category = str(context.args[0])
 
         try:
-            amount = float(context.args[1])
+            amount = float(amount_arg)
         except ValueError:
             await update.message.reply_text("❌ Invalid amount. Please provide a number.")
             return
 
-        if category.lower() == 'threshold':
+        category_lower = category.lower()
+        if category_lower == 'threshold':
             self.storage.update_user_budget(user_id, "big_ticket", amount)
             await update.message.reply_text(f"✅ Big ticket threshold set to SGD {amount:.2f}")
         else:
             user_categories = self.storage.get_user_categories(user_id)
-            if category not in user_categories and category.lower() != "total":
+            if category not in user_categories and category_lower != "total":
                 await update.message.reply_text(f"❌ Category '{category.capitalize()}' not found in your category list. Use /add_cat to add it first.")
                 return
             
             self.storage.update_user_budget(user_id, category, amount)
             await update.message.reply_text(f"✅ Budget for '{category.capitalize()}' set to SGD {amount:.2f}")
 
-    async def reset_budget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def reset_budget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         self.storage.reset_user_budget(user_id)
         await update.message.reply_text("✅ Budget reset to default values.")
 
-    async def view_budget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def view_budget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         config = self.storage.get_user_config(user_id)
         budgets = config.get("budgets", {})
         
-        response = "📊 **Current Budgets**\n"
         if budgets:
-            for category, amount in budgets.items():
-                response += f"- {category.capitalize()}: SGD {amount:.2f}\n"
+            budget_lines = "".join(f"- {category.capitalize()}: SGD {amount:.2f}\n" for category, amount in budgets.items())
         else:
-            response += "No budgets configured.\n"
+            budget_lines = "No budgets configured.\n"
             
-        response += f"\n🔥 **Big Ticket Threshold**: SGD {config['big_ticket_threshold']:.2f}"
+        response = (
+            "📊 **Current Budgets**\n"
+            f"{budget_lines}"
+            f"\n🔥 **Big Ticket Threshold**: SGD {config['big_ticket_threshold']:.2f}"
+        )
             
         await update.message.reply_text(response, parse_mode='Markdown')
 
-    async def stats_commands(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def stats_commands(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if context.args and len(context.args) >= 2:
             try:
                 year = int(context.args[0])
                 month = int(context.args[1])
-                year_month_str = f"{datetime(year, month, 1).strftime('%B %Y')}"
+                year_month_str = f"{_month_start(year, month).strftime('%B %Y')}"
             except ValueError:
                 await update.message.reply_text("❌ Invalid year or month. Use /month <year> <month>.")
                 return
-        elif not context.args or len(context.args) == 0:
+        elif not context.args:
             now = datetime.now()
             year = now.year
             month = now.month
@@ -355,50 +374,54 @@ class FinanceBot:
             )
             return
 
-        transactions = self.storage.get_transactions(user_id=user_id)
+        # year/month are None for all-time stats
+        transactions = await asyncio.to_thread(self.storage.get_transactions, user_id=user_id, year=year, month=month)
         analytics = AnalyticsEngine(transactions)
-        if year is not None and month is not None:
-            transactions = analytics.filter_transactions_by_month(year, month)
-            analytics = AnalyticsEngine(transactions)
 
-        totals = analytics.get_total_income_expense()
+        totals = analytics.summarize()
         
-        response = (
-            f"📅 **{year_month_str} Stats**\n"
-            f"Total Income: SGD {totals['income']:.2f}\n"
-            f"Total Expense: SGD {totals['expense']:.2f}\n"
-            f"Total Disbursed Expense: SGD {totals['disbursed_expense']:.2f}\n"
-            f"Total Net: SGD {totals['income'] + totals['expense']:.2f}\n"
-            f"Total Transactions: {len(transactions)}\n\n"
-            f"📂 **Category Breakdown**\n"
-        )
+        lines = [
+            f"📅 **{year_month_str} Stats**",
+            f"Total Income: SGD {totals['income']:.2f}",
+            f"Total Expense: SGD {totals['expense']:.2f}",
+            f"Total Disbursed Expense: SGD {totals['disbursed_expense']:.2f}",
+            f"Total Net: SGD {totals['income'] + totals['expense']:.2f}",
+            f"Total Transactions: {len(transactions)}",
+            "",
+            "📂 **Category Breakdown**",
+        ]
         
-        breakdown = list(analytics.get_category_breakdown().items())
-        breakdown.sort(key=lambda x: x[1])
-        for cat, amount in breakdown:
-            response += f"- {cat.capitalize()}: SGD {amount:.2f} ({abs(amount)/abs(totals['expense']) if totals['expense'] else 0:.1%})\n"
-
-        response += "\n💳 **Account Breakdown**\n"
-        account_breakdown = list(analytics.get_account_breakdown().items())
-        account_breakdown.sort(key=lambda x: x[1])
-        for acc, amount in account_breakdown:
-            response += f"- {acc}:\n\tSGD {amount:.2f} ({abs(amount)/abs(totals['expense']) if totals['expense'] else 0:.1%})\n"
-            
-        await update.message.reply_text(response, parse_mode='Markdown')
+        # Share of total expense; computed once rather than per line
+        inv_expense = 1.0 / abs(totals['expense']) if totals['expense'] else 0.0
 
-    async def daily_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
+        breakdown = sorted(totals['category_breakdown'].items(), key=itemgetter(1))
+        lines.extend(
+            f"- {cat.capitalize()}: SGD {amount:.2f} ({abs(amount) * inv_expense:.1%})"
+            for cat, amount in breakdown
+        )
+
+        lines.append("")
+        lines.append("💳 **Account Breakdown**")
+        account_breakdown = sorted(totals['account_breakdown'].items(), key=itemgetter(1))
+        lines.extend(
+            f"- {acc}:\n\tSGD {amount:.2f} ({abs(amount) * inv_expense:.1%})"
+            for acc, amount in account_breakdown
+        )
 
+        response = "\n".join(lines) + "\n"
+        await update.message.reply_text(response, parse_mode='Markdown')
+
+    @authorized
+    async def daily_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if context.args and len(context.args) >= 2:
             try:
                 year = int(context.args[0])
                 month = int(context.args[1])
+                _month_start(year, month)  # Validates the month before the storage query
             except ValueError:
                 await update.message.reply_text("❌ Invalid year or month. Use /daily <year> <month>.")
                 return
-        elif not context.args or len(context.args) == 0:
+        elif not context.args:
             now = datetime.now()
             year = now.year
             month = now.month
@@ -406,9 +429,7 @@ class FinanceBot:
             await update.message.reply_text("❌ Invalid command format. Use /daily <year> <month> or /daily for current month.")
             return
 
-        transactions = self.storage.get_transactions(user_id=user_id)
-        analytics = AnalyticsEngine(transactions)
-        month_txs = analytics.filter_transactions_by_month(year, month)
+        month_txs = await asyncio.to_thread(self.storage.get_transactions, user_id=user_id, year=year, month=month)
         analytics = AnalyticsEngine(month_txs)
 
         daily_breakdown = analytics.get_daily_breakdown()
@@ -422,66 +443,61 @@ class FinanceBot:
         num_days = calendar.monthrange(year, month)[1]
         year_month_str = datetime(year, month, 1).strftime('%B %Y')
         
-        response = f"📅 **Daily Breakdown for {year_month_str}**\n"
+        lines = [f"📅 **Daily Breakdown for {year_month_str}**"]
         if daily_budget_limit > 0:
-            response += f"Daily Budget Limit (approx): SGD {daily_budget_limit:.2f}\n"
-        response += "\n```\n"
+            lines.append(f"Daily Budget Limit (approx): SGD {daily_budget_limit:.2f}")
+        lines.append("")
+        lines.append("```")
         
         bar_max_chars = 15
+        # Padded bars for every possible length, so each row is a lookup
+        bars = ["█" * n + " " * (bar_max_chars - n) for n in range(bar_max_chars + 1)]
         
-        for day in range(1, num_days + 1):
-            amount = daily_breakdown.get(day, 0.0)
-            
-            bar_len = 0
-            if daily_budget_limit > 0:
-                fill_ratio = min(amount, daily_budget_limit) / daily_budget_limit
-                bar_len = int(fill_ratio * bar_max_chars)
-            elif amount > 0:
-                 bar_len = 0
-
-            bar = "█" * bar_len
-            response += f"{day:02d} | {bar:<{bar_max_chars}} | {amount:8.2f}\n"
+        amounts = [daily_breakdown.get(day, 0.0) for day in range(1, num_days + 1)]
+        if daily_budget_limit > 0:
+            bar_lens = [int(min(amount, daily_budget_limit) / daily_budget_limit * bar_max_chars) for amount in amounts]
+        else:
+            bar_lens = [0] * num_days
+        
+        lines.extend(
+            f"{day:02d} | {bars[bar_len]} | {amount:8.2f}"
+            for day, amount, bar_len in zip(range(1, num_days + 1), amounts, bar_lens)
+        )
             
-        response += "```"
+        lines.append("```")
+        response = "\n".join(lines)
         
         await update.message.reply_text(response, parse_mode='Markdown')
 
-    async def delete_transaction_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-        
-        if not context.args or len(context.args) != 1:
+    @authorized
+    async def delete_transaction_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+        try:
+            (transaction_id,) = context.args
+        except ValueError:
             await update.message.reply_text("❌ Usage: /delete <transaction_id>")
             return
             
-        transaction_id = context.args[0]
         if self.storage.delete_transaction(transaction_id, user_id):
             await update.message.reply_text(f"✅ Transaction {transaction_id} deleted.")
         else:
             await update.message.reply_text(f"❌ Transaction {transaction_id} not found.")
 
-    async def delete_all_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-            
+    @authorized
+    async def delete_all_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         if self.storage.delete_all_transactions(user_id):
             await update.message.reply_text("✅ All transactions deleted.")
         else:
             await update.message.reply_text("❌ Failed to delete transactions or no transactions found.")
 
-    async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = self._is_authorized(update)
-        if not user_id:
-            return
-
+    @authorized
+    async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         # Parse arguments for month/year
         year, month = None, None
         if context.args and len(context.args) >= 2:
             try:
                 year = int(context.args[0])
                 month = int(context.args[1])
+                _month_start(year, month)  # Validates the month before the storage query
             except ValueError:
                 await update.message.reply_text("❌ Invalid year or month. Use /export <year> <month>.")
                 return
@@ -493,24 +509,19 @@ class FinanceBot:
              await update.message.reply_text("❌ Usage: /export <year> <month> or /export for current month.")
              return
 
-        transactions = self.storage.get_transactions(user_id)
-        analytics = AnalyticsEngine(transactions)
-        month_txs = analytics.filter_transactions_by_month(year, month)
+        month_txs = await asyncio.to_thread(self.storage.get_transactions, user_id, year=year, month=month)
         
         if not month_txs:
             await update.message.reply_text(f"No transactions found for {month}/{year}.")
             return
 
-        temp_path = self.storage.export_transactions(month_txs)
+        export_file = await asyncio.to_thread(self.storage.export_transactions, month_txs)
             
         try:
-            with open(temp_path, 'rb') as f:
-                await update.message.reply_document(document=f, filename=f"transactions_{year}_{month}.csv")
+            await update.message.reply_document(document=export_file, filename=f"transactions_{year}_{month}.csv")
         except Exception as e:
             logger.error(f"Failed to send export: {e}")
             await update.message.reply_text("❌ Failed to send export file.")
-        finally:
-            os.unlink(temp_path)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         help_text = """
@@ -554,19 +565,13 @@ Simply forward or paste your bank transaction message.
         await update.message.reply_text(help_text, parse_mode='Markdown')
 
 
-    def _is_authorized(self, update: Update) -> int:
-        user_id = update.effective_user.id
-        if user_id not in ALLOWED_USER_IDS:
-            logger.warning(f"Unauthorized access attempt from user ID: {user_id}")
-            return 0
-        return user_id
-
     def run(self):
         if not TELEGRAM_BOT_TOKEN:
             logger.error("TELEGRAM_BOT_TOKEN not found in environment variables.")
             return
 
-        application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+        # Let one chat's slow LLM parse run alongside other chats' updates
+        application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).concurrent_updates(MAX_CONCURRENT_UPDATES).build()
         
         '''
         Available Commands:
@@ -603,23 +608,27 @@ Simply forward or paste your bank transaction message.
             BotCommand("delete", "Delete a transaction"),
             BotCommand("clear", "Delete all transactions"),
         ]
-        application.add_handler(CommandHandler("start", self.start))
-        application.add_handler(CommandHandler("help", self.help_command))
-        application.add_handler(CommandHandler("stats", self.stats_commands))
-        application.add_handler(CommandHandler("daily", self.daily_command))
-        application.add_handler(CommandHandler("delete", self.delete_transaction_command))
-        application.add_handler(CommandHandler("clear", self.delete_all_command))
-        application.add_handler(CommandHandler("export", self.export_command))
-        application.add_handler(CommandHandler("setbudget", self.set_budget_command))
-        application.add_handler(CommandHandler("resetbudget", self.reset_budget_command))
-        application.add_handler(CommandHandler("viewbudget", self.view_budget_command))
-        application.add_handler(CommandHandler("addcat", self.add_category_command))
-        application.add_handler(CommandHandler("delcat", self.delete_category_command))
-        application.add_handler(CommandHandler("resetcat", self.reset_category_command))
-        application.add_handler(CommandHandler("viewcat", self.view_category_command))
-        application.add_handler(CommandHandler("viewkeys", self.view_keywords_command))
-        application.add_handler(CommandHandler("addkey", self.add_keyword_command))
-        application.add_handler(CommandHandler("delkey", self.del_keyword_command))
+        command_handlers = [
+            ("start", self.start),
+            ("help", self.help_command),
+            ("stats", self.stats_commands),
+            ("daily", self.daily_command),
+            ("delete", self.delete_transaction_command),
+            ("clear", self.delete_all_command),
+            ("export", self.export_command),
+            ("setbudget", self.set_budget_command),
+            ("resetbudget", self.reset_budget_command),
+            ("viewbudget", self.view_budget_command),
+            ("addcat", self.add_category_command),
+            ("delcat", self.delete_category_command),
+            ("resetcat", self.reset_category_command),
+            ("viewcat", self.view_category_command),
+            ("viewkeys", self.view_keywords_command),
+            ("addkey", self.add_keyword_command),
+            ("delkey", self.del_keyword_command),
+        ]
+        for name, handler in command_handlers:
+            application.add_handler(CommandHandler(name, handler))
         application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), self.handle_message))
 
         logger.info("Bot is polling...")
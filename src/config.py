@@ -13,7 +13,10 @@ DATA_DIR.mkdir(exist_ok=True)
 # Bot Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 START_KEY = os.getenv("START_KEY")
-ALLOWED_USER_IDS = [int(uid.strip()) for uid in os.getenv("ALLOWED_USER_IDS", "").split(",") if uid.strip()]
+# A set for O(1) authorization checks; src.utils.add_allowed_user adds to it at runtime
+ALLOWED_USER_IDS: set[int] = {int(uid.strip()) for uid in os.getenv("ALLOWED_USER_IDS", "").split(",") if uid.strip()}
+# Updates processed at once; a message may wait on a Gemini call in a worker thread
+MAX_CONCURRENT_UPDATES = 8
 
 # Google Gemini Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -55,6 +58,8 @@ DEFAULT_CATEGORIES = [
     "disbursement",
     "other"
 ]
+# For membership checks; the list above keeps the display order
+DEFAULT_CATEGORIES_SET = frozenset(DEFAULT_CATEGORIES)
 
 TRANSACTION_TYPES = ["Card", "PayNow", "Transfer", "NETS QR"]
 
@@ -0,0 +1,36 @@
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+def merchant_key(description: Optional[str]) -> Optional[str]:
+    """
+    Rule key for a transaction description, or None when there is no merchant:
+    empty, or "Unknown", the rule parsers' placeholder description.
+    """
+    merchant = (description or "").lower()
+    return merchant if merchant not in ("", "unknown") else None
+
+class LearnedRules:
+    """
+    One user's merchant -> category rules, persisted through StorageManager.
+    A rule recorded from an LLM categorization is provisional: the user editing
+    that merchant's category records the edit over it. Failures are logged and
+    treated as a miss, so categorization never fails a transaction save.
+    """
+    def __init__(self, storage, user_id: Any):
+        self.storage = storage
+        self.user_id = user_id
+
+    def lookup(self, merchant: str, income: bool) -> Optional[str]:
+        try:
+            return self.storage.get_learned_category(self.user_id, merchant, income)
+        except Exception as e:
+            logger.error("Failed to look up learned category for %s: %s", merchant, e)
+            return None
+
+    def record(self, merchant: str, income: bool, category: str):
+        try:
+            self.storage.record_learned_category(self.user_id, merchant, income, category)
+        except Exception as e:
+            logger.error("Failed to record learned category for %s: %s", merchant, e)
@@ -1,19 +1,28 @@
-from typing import Dict, List, Optional, Tuple
-from google import genai
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from src.config import GOOGLE_API_KEY, DEFAULT_CATEGORIES, LLM_MODEL
+from functools import lru_cache
 import logging
 import json
 
+if TYPE_CHECKING:
+    from google import genai
+
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=32)
+def _get_client(api_key: str) -> "genai.Client":
+    # One client per API key, reused across calls (keys can be per-user).
+    # The SDK is imported here, on first use, as it takes ~0.4 s to import.
+    from google import genai
+    return genai.Client(api_key=api_key)
+
 def _init_llm_client(api_key: Optional[str] = None, model: str = LLM_MODEL):
     # Prefer passed api_key, fall back to global config
     key_to_use = api_key if api_key else GOOGLE_API_KEY
 
     if key_to_use:
         try:
-            client = genai.Client(api_key=key_to_use)
-            return client
+            return _get_client(key_to_use)
         except Exception as e:
             logger.error(f"Failed to initialize LLM client: {e}")
             return None
@@ -61,10 +70,11 @@ def categorize_transaction(message: str, categories_list: Optional[List] = None,
         logger.error(f"Error during LLM categorization: {e}")
         return "Uncategorized"
     
-def llm_parse_bank_message(message: str, transaction_type: List[str] = [], api_key: Optional[str] = None) -> Tuple[Dict[str, str], Optional[str]]:
+def llm_parse_bank_message(message: str, transaction_type: List[str] = [], api_key: Optional[str] = None, categories_list: Optional[List[str]] = None, remarks: Optional[str] = None) -> Tuple[Dict[str, str], Optional[str]]:
     """
     Uses Gemini to parse transaction details from a bank message.
     Returns a dictionary with keys: type, amount, description, account, timestamp
+    If categories_list is given, the same call also picks a category, returned under the key category.
     """
 
     client = _init_llm_client(api_key=api_key)
@@ -72,15 +82,21 @@ def llm_parse_bank_message(message: str, transaction_type: List[str] = [], api_k
     if not client:
         return {}, "LLM client not initialized (missing API key)"
 
+    category_field = ""
+    if categories_list:
+        category_field = f"""
+    - category: str (one of {", ".join(categories_list)}, using the recipient, time and remarks. If you are unsure, use "other")"""
+    remarks_line = f'\n    Remarks: "{remarks}"' if remarks else ""
+
     prompt = f"""
     You are a financial assistant. Parse the following bank message and extract the following details if it is a transaction:
     - type: str (standardized transaction type, one of {transaction_type})
     - amount: float (signed, negative for expense, positive for income)
     - description: str (merchant, recipient)
     - account: str (account or card number/identifier)
-    - timestamp: datetime (optional, parsed from message, ISO8601. If time or date is not available, set to this field to null)
+    - timestamp: datetime (optional, parsed from message, ISO8601. If time or date is not available, set to this field to null){category_field}
 
-    Bank Message: "{message}"
+    Bank Message: "{message}"{remarks_line}
 
     Return only the details in JSON format based on the above keys. If for optional fields you cannot find the information, set them to null.
     If the message does not describe a transaction, return "ERROR: Not a transaction.".
@@ -6,6 +6,7 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from api.db import engine, Base
 from src.bot_interface import FinanceBot
 
 # Configure logging
@@ -15,5 +16,9 @@ logging.basicConfig(
 )
 
 if __name__ == '__main__':
+    # Create tables; the bot can run without the API process (bot.service),
+    # so it cannot rely on api/main.py having created them
+    Base.metadata.create_all(bind=engine)
+
     bot = FinanceBot()
     bot.run()
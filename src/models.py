@@ -1,7 +1,18 @@
 from dataclasses import dataclass, field, asdict
+from datetime import datetime
 from typing import Optional
 from dateutil import parser as date_parser
 
+def parse_iso_timestamp(timestamp: str) -> datetime:
+    """
+    Parses an ISO 8601 timestamp. Tries the C-implemented datetime.fromisoformat
+    first and falls back to dateutil's isoparse for forms it rejects.
+    """
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return date_parser.isoparse(timestamp)
+
 @dataclass
 class TransactionData:
     type: str
@@ -16,12 +27,15 @@ class TransactionData:
     status: Optional[str] = None
 
     def __post_init__(self):
+        # (timestamp string, parsed datetime) from the last parse; not a dataclass field
+        self._timestamp_cache = None
+
         # Validate timestamp
         if self.timestamp is not None:
             ts = self.timestamp.strip()
             if ts:
                 try:
-                    date_parser.isoparse(ts)
+                    self._timestamp_cache = (self.timestamp, parse_iso_timestamp(ts))
                 except Exception:
                     raise ValueError(f"Invalid timestamp format: {self.timestamp}")
 
@@ -32,5 +46,28 @@ class TransactionData:
              except ValueError:
                  raise ValueError(f"Invalid amount: {self.amount}")
 
+    @property
+    def timestamp_dt(self) -> Optional[datetime]:
+        """
+        The timestamp as a datetime, reusing the parse done during validation.
+        Re-parses only if `timestamp` has been reassigned since.
+        """
+        cache = self._timestamp_cache
+        if cache is None or cache[0] != self.timestamp:
+            if not self.timestamp or not self.timestamp.strip():
+                return None
+            cache = (self.timestamp, parse_iso_timestamp(self.timestamp.strip()))
+            self._timestamp_cache = cache
+        return cache[1]
+
+    def set_timestamp(self, timestamp: str, parsed: Optional[datetime] = None):
+        """
+        Assigns `timestamp`. Pass `parsed` when the caller already holds the
+        datetime for it, so `timestamp_dt` does not parse it again.
+        """
+        self.timestamp = timestamp
+        if parsed is not None:
+            self._timestamp_cache = (timestamp, parsed)
+
     def to_dict(self):
         return asdict(self)
@@ -2,30 +2,48 @@ import re
 import logging
 import uuid
 from datetime import datetime
-from dateutil import parser as date_parser
-from typing import List, Optional, Tuple, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Dict, Any
 from src.llm_helper import categorize_transaction
 from src.banks import UOBParser
-from src.models import TransactionData
+from src.models import TransactionData, parse_iso_timestamp
+from src.config import DEFAULT_CATEGORIES
+from src.learned_rules import LearnedRules, merchant_key
 
 logger = logging.getLogger(__name__)
 
+# "{Bank_Msg},{bank},{ISO_Timestamp},{Remarks}", anchored on the ISO timestamp in the middle
+# e.g. 2025-12-28T15:57:31+08:00
+_SPLIT_PATTERN = re.compile(r"(.*),(\w+),(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2}),(.*)", re.DOTALL)
+
+@lru_cache(maxsize=32)
+def _category_name_keywords(categories: Tuple[str, ...]) -> Dict[str, Tuple[str, ...]]:
+    # Fallback keyword map when the user has none: each category matches its own name.
+    # Shared between calls through the cache, so the keyword lists are tuples.
+    return {cat: (cat.lower(),) for cat in categories}
+
+def _match_keywords(text: str, keywords: Dict[str, Sequence[str]]) -> Optional[str]:
+    # First category, in map order, with a keyword in text. Plain loops rather
+    # than any() over a generator, which costs a generator object per category.
+    for cat, words in keywords.items():
+        for word in words:
+            if word in text:
+                return cat
+    return None
+
 class TransactionParser:
     def __init__(self):
         self.bank_parsers = {
             "UOB": UOBParser(),
         }
 
-    def parse_message(self, full_message: str, categories_list: Optional[List] = None, keywords_map: Optional[Dict] = None, api_key: Optional[str] = None) -> Tuple[Optional[TransactionData], Optional[str]]:
+    def parse_message(self, full_message: str, categories_list: Optional[List] = None, keywords_map: Optional[Dict] = None, api_key: Optional[str] = None, learned_rules: Optional[LearnedRules] = None) -> Tuple[Optional[TransactionData], Optional[str]]:
         """
         Parses the composite message from Apple Shortcuts.
         Format: "{Bank_Msg},{bank},{ISO_Timestamp},{Remarks}"
         """
         # Split the message. We expect the ISO timestamp to be the anchor.
-        # Regex to find the ISO timestamp in the middle
-        # 2025-12-28T15:57:31+08:00
-        split_pattern = re.compile(r"(.*),(\w+),(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2}),(.*)", re.DOTALL)
-        match = split_pattern.match(full_message)
+        match = _SPLIT_PATTERN.match(full_message)
         
         if not match:
             logger.error(f"Failed to split message: {full_message}")
@@ -38,9 +56,9 @@ class TransactionParser:
             "remarks": match.group(4).strip()
         }
 
-        return self.parse_structured_data(data, categories_list, keywords_map, api_key, full_message=full_message)
+        return self.parse_structured_data(data, categories_list, keywords_map, api_key, full_message=full_message, learned_rules=learned_rules)
 
-    def parse_structured_data(self, data: Dict[str, Any], categories_list: Optional[List] = None, keywords_map: Optional[Dict] = None, api_key: Optional[str] = None, full_message: Optional[str] = None) -> Tuple[Optional[TransactionData], Optional[str]]:
+    def parse_structured_data(self, data: Dict[str, Any], categories_list: Optional[List] = None, keywords_map: Optional[Dict] = None, api_key: Optional[str] = None, full_message: Optional[str] = None, learned_rules: Optional[LearnedRules] = None) -> Tuple[Optional[TransactionData], Optional[str]]:
         """
         Parses structured JSON input.
         """
@@ -67,7 +85,10 @@ class TransactionParser:
             status = f"Warning: No parsing rules matched for bank message: <blockquote expandable>{bank_msg}</blockquote>"
 
             # If no parsing rules matched, use LLM-based parsing
-            parsed_data, llm_err = parser.llm_parse(bank_msg, api_key=api_key)
+            # The same call picks the category, used if no keyword matches below
+            parsed_data, llm_err = parser.llm_parse(
+                bank_msg, api_key=api_key, categories_list=categories_list or DEFAULT_CATEGORIES, remarks=remarks
+            )
             if not parsed_data:
                 return None, f"LLM-parsing failed for <blockquote expandable>{llm_err}</blockquote>. Full message: <pre>{bank_msg}</pre>"
             
@@ -77,10 +98,10 @@ class TransactionParser:
         if parsed_data.status and parser.TIME_PARSE_WARNING in parsed_data.status:
             # use shortcut_timestamp_str if the parser time and shortcut time is within the same day, else keep parser status
             try:
-                parser_time = date_parser.isoparse(parsed_data.timestamp)
-                shortcut_time = date_parser.isoparse(shortcut_timestamp_str)
+                parser_time = parsed_data.timestamp_dt
+                shortcut_time = parse_iso_timestamp(shortcut_timestamp_str)
                 if parser_time.date() == shortcut_time.date():
-                    parsed_data.timestamp = shortcut_timestamp_str
+                    parsed_data.set_timestamp(shortcut_timestamp_str, shortcut_time)
             except Exception as e:
                 logger.error(f"Failed to compare timestamps: {e}")
                 # keep existing status
@@ -92,14 +113,16 @@ class TransactionParser:
             logger.warning(f"Parsed bank {parsed_data.bank} differs from shortcut bank {bank_name}. Using parser's value if valid, or shortcut's.")
             return None, f"Bank name mismatch: parsed '{parsed_data.bank}' vs shortcut '{bank_name}'"
 
+        # Parsed once already when the TransactionData was built; reuse it
         try:
-            date_parser.isoparse(parsed_data.timestamp)
+            if parsed_data.timestamp_dt is None:
+                raise ValueError("empty timestamp")
         except Exception as e:
             logger.error(f"Failed to parse shortcut timestamp '{parsed_data.timestamp}': {e}")
             return None, "Invalid timestamp format"
 
         # Categorization
-        category = self._categorize(parsed_data, remarks, full_message, categories_list, keywords_map, api_key=api_key)
+        category = self._categorize(parsed_data, remarks, full_message, categories_list, keywords_map, api_key=api_key, learned_rules=learned_rules)
 
         # Description
         description = f"{remarks}" if remarks else ""
@@ -118,30 +141,41 @@ class TransactionParser:
 
         return parsed_data, status
 
-    def _categorize(self, parsed_data: TransactionData, remarks: str, full_message: str, categories_list: Optional[List[str]] = None, keywords_map: Optional[Dict] = None, api_key: Optional[str] = None) -> str:
+    def _categorize(self, parsed_data: TransactionData, remarks: str, full_message: str, categories_list: Optional[List[str]] = None, keywords_map: Optional[Dict] = None, api_key: Optional[str] = None, learned_rules: Optional[LearnedRules] = None) -> str:
+        categories = tuple(categories_list or DEFAULT_CATEGORIES)
+
         # 1. Keyword based (Simple)
         if keywords_map:
             keywords = keywords_map
         elif categories_list:
-            keywords = { cat: [cat.lower()] for cat in categories_list }
+            keywords = _category_name_keywords(categories)
         else:
             keywords = {}
 
-        # Check remarks first
-        text_to_check = remarks.lower()
-        if "disbursement" in text_to_check:
-            return "disbursement"
-        for cat, words in keywords.items():
-            if any(word in text_to_check for word in words):
-                return cat
-
-        # Check description next
-        text_to_check = (parsed_data.description or "").lower()
-        if "disbursement" in text_to_check:
-            return "disbursement"
-        for cat, words in keywords.items():
-            if any(word in text_to_check for word in words):
-                return cat
-
-        # 2. LLM Fallback
-        return categorize_transaction(full_message, categories_list, api_key=api_key)
+        # Check remarks first, then description
+        for text in (remarks, parsed_data.description):
+            text_to_check = (text or "").lower()
+            if "disbursement" in text_to_check:
+                return "disbursement"
+            category = _match_keywords(text_to_check, keywords)
+            if category:
+                return category
+
+        # 2. LLM Fallback, skipped if the LLM parse already chose a category
+        if parsed_data.category in categories:
+            return parsed_data.category
+
+        # Recurring merchants/recipients reuse the category in the user's persisted
+        # rules: the first LLM answer, or the user's own correction of it
+        merchant = merchant_key(parsed_data.description)
+        income = parsed_data.amount > 0
+        learnable = learned_rules is not None and merchant is not None
+        category = learned_rules.lookup(merchant, income) if learnable else None
+        if category in categories:
+            return category
+
+        category = categorize_transaction(full_message, categories_list, api_key=api_key)
+        # Only keep real answers, not the "Other"/"Uncategorized" fallbacks for errors
+        if category in categories and learnable:
+            learned_rules.record(merchant, income, category)
+        return category
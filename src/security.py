@@ -3,6 +3,7 @@ from cryptography.fernet import Fernet
 import os
 import base64
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,9 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 # Encryption setup
+# The key is fixed for the life of the process, so build the Fernet once.
+# Tests that change ENCRYPTION_KEY should call _get_fernet.cache_clear().
+@lru_cache(maxsize=1)
 def _get_fernet():
     key = os.getenv("ENCRYPTION_KEY")
     if not key:
@@ -1,19 +1,22 @@
 import logging
 import json
 import uuid
-import tempfile
+import io
 import csv
+from contextlib import contextmanager
 from copy import deepcopy
-from typing import List, Dict, Any, Optional
+from operator import attrgetter
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pathlib import Path
-from dateutil import parser as date_parser
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy import delete
 
-from src.config import DEFAULT_BUDGETS, BIG_TICKET_THRESHOLD, DEFAULT_CATEGORIES, DEFAULT_KEYWORDS
+from src.config import DEFAULT_BUDGETS, BIG_TICKET_THRESHOLD, DEFAULT_CATEGORIES, DEFAULT_CATEGORIES_SET, DEFAULT_KEYWORDS
 from src.models import TransactionData
 from api.db import SessionLocal
-from api.models import User, UserConfiguration, Transaction as DBTransaction
+from api.models import User, UserConfiguration, LearnedCategory, Transaction as DBTransaction
 from src.security import get_password_hash
 
 logger = logging.getLogger(__name__)
@@ -21,6 +24,15 @@ logger = logging.getLogger(__name__)
 # Legacy fieldnames for export compatibility
 FIELDNAMES = ["id", "timestamp", "bank", "type", "amount", "description", "account", "category", "raw_message", "status"]
 
+# TransactionData -> tuple of its values in FIELDNAMES order
+_export_row = attrgetter(*FIELDNAMES)
+
+def _month_filter(year: int, month: int) -> tuple:
+    """Range conditions on the indexed timestamp column selecting one calendar month."""
+    month_start = datetime(year, month, 1)
+    next_month_start = datetime(year + month // 12, month % 12 + 1, 1)
+    return DBTransaction.timestamp >= month_start, DBTransaction.timestamp < next_month_start
+
 class StorageManager:
     def __init__(self, file_path: Optional[Path] = None):
         # file_path arg is deprecated but kept for signature compatibility
@@ -91,212 +103,224 @@ class StorageManager:
 
     def get_user_config(self, user_id: Any) -> Dict[str, Any]:
         with self._get_db() as db:
-            user = self._get_user(db, user_id)
-            if not user.configuration:
-                self._initialize_user_config_db(db, user)
-                db.refresh(user)
-
-            config = user.configuration
-
-            # Construct the legacy config dictionary structure
-            return {
-                "budgets": config.budgets,
-                "big_ticket_threshold": config.big_ticket_threshold,
-                "categories": config.categories,
-                "keywords": config.keywords,
-                "tracking_items": config.tracking_items or []
-            }
+            if not isinstance(user_id, User):
+                # Telegram ID: fetch the configuration in one joined query
+                config = (
+                    db.query(UserConfiguration)
+                    .join(User, UserConfiguration.user_id == User.id)
+                    .filter(User.telegram_id == user_id)
+                    .first()
+                )
+                if config:
+                    return self._config_dict(config)
+
+            return self._config_dict(self._get_config_row(db, user_id))
+
+    @staticmethod
+    def _config_dict(config: UserConfiguration) -> Dict[str, Any]:
+        # Construct the legacy config dictionary structure
+        return {
+            "budgets": config.budgets,
+            "big_ticket_threshold": config.big_ticket_threshold,
+            "categories": config.categories,
+            "keywords": config.keywords,
+            "tracking_items": config.tracking_items or []
+        }
 
     def save_user_config(self, user_id: Any, config_dict: Dict[str, Any]):
         with self._get_db() as db:
-            user = self._get_user(db, user_id)
-            config = user.configuration
-            if not config:
-                self._initialize_user_config_db(db, user)
-                db.refresh(user)
-                config = user.configuration
-
-            # Update fields
-            if "budgets" in config_dict:
-                config.budgets = config_dict["budgets"]
-            if "categories" in config_dict:
-                config.categories = config_dict["categories"]
-            if "keywords" in config_dict:
-                config.keywords = config_dict["keywords"]
-            if "big_ticket_threshold" in config_dict:
-                config.big_ticket_threshold = config_dict["big_ticket_threshold"]
-            if "tracking_items" in config_dict:
-                config.tracking_items = config_dict["tracking_items"]
-
-            # Flag modified for JSON fields to ensure SQLAlchemy updates them
-            from sqlalchemy.orm.attributes import flag_modified
-            flag_modified(config, "budgets")
-            flag_modified(config, "categories")
-            flag_modified(config, "keywords")
-            flag_modified(config, "tracking_items")
-
+            config = self._get_config_row(db, user_id)
+            self._apply_config(config, config_dict)
             db.commit()
 
-    # The following wrapper methods maintain compatibility by calling get_user_config/save_user_config
-    # which now interact with the DB.
+    @contextmanager
+    def edit_config(self, user_id: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the user's config dict for in-place edits, then writes back only the
+        fields that changed, reading and writing in a single session.
+        Nothing is written if the block raises or leaves the config unchanged.
+        """
+        with self._get_db() as db:
+            config = self._get_config_row(db, user_id)
+            config_dict = self._config_dict(config)
+            before = deepcopy(config_dict)
+            yield config_dict
+
+            changed = {k: v for k, v in config_dict.items() if before.get(k) != v}
+            if changed:
+                self._apply_config(config, changed)
+                db.commit()
+
+    def _get_config_row(self, db: Session, user_id: Any) -> UserConfiguration:
+        user = self._get_user(db, user_id)
+        if not user.configuration:
+            self._initialize_user_config_db(db, user)
+            db.refresh(user)
+        return user.configuration
+
+    @staticmethod
+    def _apply_config(config: UserConfiguration, config_dict: Dict[str, Any]):
+        for field in ("budgets", "categories", "keywords", "big_ticket_threshold", "tracking_items"):
+            if field in config_dict:
+                setattr(config, field, config_dict[field])
+                # Flag modified for JSON fields to ensure SQLAlchemy updates them,
+                # since in-place edits to the stored objects are not tracked
+                flag_modified(config, field)
+
+    # The following wrapper methods maintain compatibility by reading and writing
+    # the config through edit_config, which now interacts with the DB.
 
     def get_user_categories(self, user_id: int) -> List[str]:
-        config = self.get_user_config(user_id)
-        return config.get("categories", deepcopy(DEFAULT_CATEGORIES))
+        categories = self.get_user_config(user_id).get("categories")
+        # Copy the defaults only when they are actually needed
+        return categories if categories is not None else deepcopy(DEFAULT_CATEGORIES)
 
     def get_user_keywords(self, user_id: int) -> Dict[str, List[str]]:
-        config = self.get_user_config(user_id)
-        return config.get("keywords", deepcopy(DEFAULT_KEYWORDS))
+        keywords = self.get_user_config(user_id).get("keywords")
+        return keywords if keywords is not None else deepcopy(DEFAULT_KEYWORDS)
 
     def add_user_keywords(self, user_id: int, category: str, keywords_to_add: List[str]) -> tuple[List[str], List[str]]:
-        config = self.get_user_config(user_id)
-        keywords_map = config["keywords"]
-        categories = config["categories"]
-        keywords_to_add_set = {k.strip().lower() for k in keywords_to_add if k.strip()}
-        
-        target_category = None
-        for cat in categories:
-            if cat.lower() == category.lower():
-                target_category = cat
-                break
-        
-        if not target_category:
-            raise ValueError(f"Category '{category}' does not exist. Please add the category first using /addcat.")
-            
-        if target_category not in keywords_map:
-            keywords_map[target_category] = [target_category.lower()]
+        with self.edit_config(user_id) as config:
+            keywords_map = config["keywords"]
+            categories = config["categories"]
+            keywords_to_add_set = {k.strip().lower() for k in keywords_to_add if k.strip()}
+
+            target_category = None
+            for cat in categories:
+                if cat.lower() == category.lower():
+                    target_category = cat
+                    break
+
+            if not target_category:
+                raise ValueError(f"Category '{category}' does not exist. Please add the category first using /addcat.")
+
+            if target_category not in keywords_map:
+                keywords_map[target_category] = [target_category.lower()]
+
+            added = []
+            errors = []
+
+            # Owning category of every keyword for the uniqueness check, built in one
+            # pass; the first category listing a keyword owns it, unless the target does
+            owners = {}
+            for cat, keys in keywords_map.items():
+                for k in keys:
+                    owners.setdefault(k, cat)
+            owners.update(dict.fromkeys(keywords_map[target_category], target_category))
+
+            for keyword in keywords_to_add_set:
+                k_lower = keyword.strip().lower()
+                if not k_lower: continue
 
-        added = []
-        errors = []
-        
-        # Flatten all other keywords for uniqueness check
-        all_keywords = set()
-        for cat, keys in keywords_map.items():
-            for k in keys:
-                all_keywords.add(k)
-
-        for keyword in keywords_to_add_set:
-            k_lower = keyword.strip().lower()
-            if not k_lower: continue
-
-            if k_lower in all_keywords:
-                if k_lower in keywords_map[target_category]:
-                    errors.append(f"'{keyword}' already exists in category '{target_category}'")
-                else:
-                    owner = next((c for c, keys in keywords_map.items() if k_lower in keys), "another category")
+                owner = owners.get(k_lower)
+                if owner is not None:
                     errors.append(f"'{keyword}' already exists in category '{owner}'")
-            else:
-                keywords_map[target_category].append(k_lower)
-                all_keywords.add(k_lower)
-                added.append(k_lower)
-        
-        config["keywords"] = keywords_map
-        self.save_user_config(user_id, config)
+                else:
+                    keywords_map[target_category].append(k_lower)
+                    owners[k_lower] = target_category
+                    added.append(k_lower)
+
+            config["keywords"] = keywords_map
         return added, errors
 
     def delete_user_keywords(self, user_id: int, category: str, keywords_to_delete: List[str]) -> tuple[List[str], List[str]]:
-        config = self.get_user_config(user_id)
-        keywords_map = config["keywords"]
-        categories = config["categories"]
-        keywords_to_delete_set = {k.strip().lower() for k in keywords_to_delete if k.strip()}
-
-        target_category = None
-        for cat in categories:
-            if cat.lower() == category.lower():
-                target_category = cat
-                break
-        
-        if not target_category:
-            raise ValueError(f"Category '{category}' does not exist. Please add the category first using /addcat.")
-            
-        deleted = []
-        errors = []
-        
-        if target_category in keywords_map:
-            current_keys = keywords_map[target_category]
-            for keyword in keywords_to_delete_set:
-                k_lower = keyword.strip().lower()
-                if k_lower == target_category.lower():
-                    errors.append(f"Cannot delete category name '{keyword}'")
-                    continue
+        with self.edit_config(user_id) as config:
+            keywords_map = config["keywords"]
+            categories = config["categories"]
+            keywords_to_delete_set = {k.strip().lower() for k in keywords_to_delete if k.strip()}
+
+            target_category = None
+            for cat in categories:
+                if cat.lower() == category.lower():
+                    target_category = cat
+                    break
+
+            if not target_category:
+                raise ValueError(f"Category '{category}' does not exist. Please add the category first using /addcat.")
+
+            deleted = []
+            errors = []
+
+            if target_category in keywords_map:
+                current_keys = keywords_map[target_category]
+                for keyword in keywords_to_delete_set:
+                    k_lower = keyword.strip().lower()
+                    if k_lower == target_category.lower():
+                        errors.append(f"Cannot delete category name '{keyword}'")
+                        continue
+
+                    if k_lower in current_keys:
+                        current_keys.remove(k_lower)
+                        deleted.append(k_lower)
+                    else:
+                        errors.append(f"'{keyword}' not found in '{target_category}'")
+
+                config["keywords"] = keywords_map
 
-                if k_lower in current_keys:
-                    current_keys.remove(k_lower)
-                    deleted.append(k_lower)
-                else:
-                    errors.append(f"'{keyword}' not found in '{target_category}'")
-
-            config["keywords"] = keywords_map
-            self.save_user_config(user_id, config)
-            
         return deleted, errors
 
     def update_user_budget(self, user_id: int, category: str, amount: float):
-        config = self.get_user_config(user_id)
-        if category == "big_ticket":
-            config["big_ticket_threshold"] = amount
-        else:
-            config["budgets"][category] = amount
-        self.save_user_config(user_id, config)
+        with self.edit_config(user_id) as config:
+            if category == "big_ticket":
+                config["big_ticket_threshold"] = amount
+            else:
+                config["budgets"][category] = amount
 
     def reset_user_budget(self, user_id: int):
-        config = self.get_user_config(user_id)
-        config["budgets"] = deepcopy(DEFAULT_BUDGETS)
-        config["big_ticket_threshold"] = BIG_TICKET_THRESHOLD
-        self.save_user_config(user_id, config)
+        with self.edit_config(user_id) as config:
+            config["budgets"] = deepcopy(DEFAULT_BUDGETS)
+            config["big_ticket_threshold"] = BIG_TICKET_THRESHOLD
 
     def add_user_categories(self, user_id: int, categories: List[str]) -> tuple[List[str], List[str]]:
-        config = self.get_user_config(user_id)
-        current_categories = set(config["categories"])
-        added = []
-        errors = []
-        
-        for cat in categories:
-            cat_lower = cat.strip().lower()
-            if not cat_lower: continue
-            if cat_lower in current_categories:
-                errors.append(f"Category '{cat}' already exists.")
-            else:
-                current_categories.add(cat_lower)
-                if cat_lower not in config["keywords"]:
-                    config["keywords"][cat_lower] = [cat_lower]
-                added.append(cat_lower)
-                
-        config["categories"] = sorted(list(current_categories))
-        self.save_user_config(user_id, config)
+        with self.edit_config(user_id) as config:
+            current_categories = set(config["categories"])
+            added = []
+            errors = []
+
+            for cat in categories:
+                cat_lower = cat.strip().lower()
+                if not cat_lower: continue
+                if cat_lower in current_categories:
+                    errors.append(f"Category '{cat}' already exists.")
+                else:
+                    current_categories.add(cat_lower)
+                    if cat_lower not in config["keywords"]:
+                        config["keywords"][cat_lower] = [cat_lower]
+                    added.append(cat_lower)
+
+            if added:
+                config["categories"] = sorted(list(current_categories))
         return added, errors
 
     def delete_user_categories(self, user_id: int, categories: List[str]) -> tuple[List[str], List[str]]:
-        config = self.get_user_config(user_id)
-        current_categories = set(config["categories"])
-        default_categories_lower = {c.lower() for c in DEFAULT_CATEGORIES}
-        deleted = []
-        errors = []
-        
-        for cat in categories:
-            cat_lower = cat.strip().lower()
-            if not cat_lower: continue
-            if cat_lower not in current_categories:
-                errors.append(f"Category '{cat}' not found.")
-                continue
-            if cat_lower in default_categories_lower:
-                errors.append(f"Cannot delete default category '{cat}'.")
-                continue
-            
-            current_categories.discard(cat_lower)
-            if cat_lower in config["keywords"]:
-                del config["keywords"][cat_lower]
-            deleted.append(cat_lower)
-            
-        config["categories"] = list(current_categories)
-        self.save_user_config(user_id, config)
+        with self.edit_config(user_id) as config:
+            current_categories = set(config["categories"])
+            deleted = []
+            errors = []
+
+            for cat in categories:
+                cat_lower = cat.strip().lower()
+                if not cat_lower: continue
+                if cat_lower not in current_categories:
+                    errors.append(f"Category '{cat}' not found.")
+                    continue
+                if cat_lower in DEFAULT_CATEGORIES_SET:
+                    errors.append(f"Cannot delete default category '{cat}'.")
+                    continue
+
+                current_categories.discard(cat_lower)
+                if cat_lower in config["keywords"]:
+                    del config["keywords"][cat_lower]
+                deleted.append(cat_lower)
+
+            if deleted:
+                config["categories"] = list(current_categories)
         return deleted, errors
 
     def reset_user_categories(self, user_id: int):
-        config = self.get_user_config(user_id)
-        config["categories"] = [cat.lower() for cat in deepcopy(DEFAULT_CATEGORIES)]
-        config["keywords"] = deepcopy(DEFAULT_KEYWORDS)
-        self.save_user_config(user_id, config)
+        with self.edit_config(user_id) as config:
+            config["categories"] = [cat.lower() for cat in DEFAULT_CATEGORIES]
+            config["keywords"] = deepcopy(DEFAULT_KEYWORDS)
 
     def save_transaction(self, transaction: TransactionData, user_id: Any):
         with self._get_db() as db:
@@ -304,7 +328,9 @@ class StorageManager:
             
             # Convert TransactionData to DBTransaction
             try:
-                ts = date_parser.isoparse(transaction.timestamp)
+                ts = transaction.timestamp_dt
+                if ts is None:
+                    raise ValueError("empty timestamp")
             except Exception:
                 # Should not happen as validated in TransactionData
                 logger.error(f"Invalid timestamp in save_transaction: {transaction.timestamp}")
@@ -325,12 +351,19 @@ class StorageManager:
             )
             db.merge(db_tx) # merge to allow updates if ID exists (though ID is UUID usually)
             db.commit()
-            logger.info(f"Transaction saved: {transaction.id}")
+            logger.info("Transaction saved: %s", transaction.id)
 
-    def get_transactions(self, user_id: Any) -> List[TransactionData]:
+    def get_transactions(self, user_id: Any, year: Optional[int] = None, month: Optional[int] = None) -> List[TransactionData]:
+        """
+        Returns the user's transactions, optionally only those in the given month.
+        The month filter is a range on the indexed timestamp column.
+        """
         with self._get_db() as db:
             user = self._get_user(db, user_id)
-            db_txs = db.query(DBTransaction).filter(DBTransaction.user_id == user.id).all()
+            query = db.query(DBTransaction).filter(DBTransaction.user_id == user.id)
+            if year is not None and month is not None:
+                query = query.filter(*_month_filter(year, month))
+            db_txs = query.all()
             
             transactions = []
             for tx in db_txs:
@@ -349,6 +382,19 @@ class StorageManager:
                 ))
             return transactions
 
+    def get_category_amounts(self, user_id: Any, year: int, month: int) -> List[Tuple[str, float]]:
+        """
+        Returns (category, amount) for each of the user's transactions in the month,
+        without loading full rows or building TransactionData objects.
+        """
+        with self._get_db() as db:
+            user = self._get_user(db, user_id)
+            rows = db.query(DBTransaction.category, DBTransaction.amount).filter(
+                DBTransaction.user_id == user.id,
+                *_month_filter(year, month)
+            ).all()
+            return [(category, amount) for category, amount in rows]
+
     def get_transaction(self, transaction_id: str, user_id: Any) -> Optional[TransactionData]:
         with self._get_db() as db:
             user = self._get_user(db, user_id)
@@ -395,12 +441,37 @@ class StorageManager:
             logger.info(f"All transactions deleted for user {user_id}")
             return True
 
-    def export_transactions(self, transactions: List[TransactionData]) -> str:
-        # Create a temporary CSV file (Legacy logic preserved)
-        transactions_list = [t.to_dict() for t in transactions]
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-            writer.writeheader()
-            writer.writerows(transactions_list)
-            temp_path = f.name
-        return temp_path
+    def get_learned_category(self, user_id: Any, merchant: str, income: bool) -> Optional[str]:
+        with self._get_db() as db:
+            user = self._get_user(db, user_id)
+            rule = db.query(LearnedCategory).filter(
+                LearnedCategory.user_id == user.id,
+                LearnedCategory.merchant == merchant,
+                LearnedCategory.income == income
+            ).first()
+            return rule.category if rule else None
+
+    def record_learned_category(self, user_id: Any, merchant: str, income: bool, category: str):
+        with self._get_db() as db:
+            user = self._get_user(db, user_id)
+            rule = db.query(LearnedCategory).filter(
+                LearnedCategory.user_id == user.id,
+                LearnedCategory.merchant == merchant,
+                LearnedCategory.income == income
+            ).first()
+            if rule:
+                rule.category = category
+            else:
+                db.add(LearnedCategory(user_id=user.id, merchant=merchant, income=income, category=category))
+            db.commit()
+
+    def export_transactions(self, transactions: List[TransactionData]) -> io.BytesIO:
+        """
+        Renders transactions as CSV into an in-memory UTF-8 file object,
+        positioned at the start and ready to be sent.
+        """
+        output = io.StringIO(newline='')
+        writer = csv.writer(output)
+        writer.writerow(FIELDNAMES)
+        writer.writerows(_export_row(t) for t in transactions)
+        return io.BytesIO(output.getvalue().encode('utf-8'))
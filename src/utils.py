@@ -8,14 +8,14 @@ def add_allowed_user(user_id: int) -> bool:
     if user_id in ALLOWED_USER_IDS:
         return False
     
-    # Update in-memory list
-    ALLOWED_USER_IDS.append(user_id)
+    # Update in-memory set
+    ALLOWED_USER_IDS.add(user_id)
     
     # Update .env file
     env_path = BASE_DIR / ".env"
     
     # Reconstruct the string
-    new_value = ",".join(map(str, ALLOWED_USER_IDS))
+    new_value = ",".join(map(str, sorted(ALLOWED_USER_IDS)))
     
     # Update .env using dotenv's set_key which handles quoting/parsing safely
     # Note: set_key creates the file if it doesn't exist, but we expect it to exist.
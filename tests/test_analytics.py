@@ -65,3 +65,26 @@ def test_daily_breakdown(sample_transactions):
     assert breakdown[29] == 150.0
     assert 30 not in breakdown
 
+
+def test_summarize_matches_individual_breakdowns(sample_transactions):
+    sample_transactions.append(
+        TransactionData(id="5", timestamp="2025-12-30T09:00:00", type="PayNow Incoming", amount=30.0, category="disbursement", bank="Test", description="")
+    )
+    analytics = AnalyticsEngine(sample_transactions)
+    summary = analytics.summarize()
+
+    totals = analytics.get_total_income_expense()
+    assert summary["income"] == totals["income"]
+    assert summary["expense"] == totals["expense"]
+    assert summary["disbursed_expense"] == totals["disbursed_expense"]
+    assert summary["category_breakdown"] == analytics.get_category_breakdown()
+    assert summary["account_breakdown"] == analytics.get_account_breakdown()
+
+def test_budget_alerts_from_totals(sample_transactions):
+    budgets = {"Total": 1000.0, "Food": 200.0}
+    engine = AnalyticsEngine(sample_transactions)
+    category_spend = AnalyticsEngine.get_category_spend((t.category, t.amount) for t in sample_transactions)
+
+    assert category_spend["Food"] == 170.0
+    assert category_spend["Total"] == 220.0
+    assert AnalyticsEngine.check_budget_alerts_from_totals(category_spend, budgets) == engine.check_budget_alerts(sample_transactions, budgets)
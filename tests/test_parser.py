@@ -1,4 +1,5 @@
 import pytest
+from datetime import datetime
 from src.parser import TransactionParser
 from src.models import TransactionData
 
@@ -81,3 +82,139 @@ def test_timestamp_diff_day_no_modify_time(parser):
     assert result.status is not None
     assert "TIME_PARSE_WARNING" in result.status
     assert result.timestamp is not None and result.timestamp == "2025-12-26T00:00:00+08:00"
+
+def test_timestamp_dt_tracks_timestamp(parser):
+    msg = "A transaction of SGD 100.00 was made with your UOB Card ending 3456 on 09/01/2026 at Gift Shop. If unauthorised, call 24/7 Fraud Hotline now,UOB,2026-01-09T22:08:02+08:00, Birthday Gift"
+    result, _ = parser.parse_message(msg)
+
+    assert result is not None
+    assert result.timestamp_dt.isoformat() == result.timestamp
+    assert "_timestamp_cache" not in result.to_dict()
+
+def test_type_mapping_partial_match(parser):
+    msg = "You made a NETS QR payment of SGD 5.00 to KOPITIAM at 12:01PM SGT, 5 Jan 26, on your a/c ending 2222. If unauthorised, call UOB 24/7 Fraud Hotline.,UOB,2026-01-05T12:01:30+08:00, Lunch"
+    result, _ = parser.parse_message(msg)
+
+    assert result is not None
+    assert result.type == "NETS QR"
+    assert result.amount == -5.00
+    assert result.account == "2222"
+
+def test_set_timestamp_reuses_parsed_datetime():
+    tx = TransactionData(id="1", timestamp="2026-01-09T00:00:00+08:00", type="Card", amount=-1.0, bank="UOB", description="")
+    dt = datetime.fromisoformat("2026-01-09T22:08:02+08:00")
+    tx.set_timestamp("2026-01-09T22:08:02+08:00", dt)
+
+    assert tx.timestamp == "2026-01-09T22:08:02+08:00"
+    assert tx.timestamp_dt is dt
+
+    tx.timestamp = "2026-01-10T08:00:00+08:00"
+    assert tx.timestamp_dt == datetime.fromisoformat("2026-01-10T08:00:00+08:00")
+
+def test_llm_parse_category_skips_categorize_call(parser, monkeypatch):
+    def fake_llm_parse(message, transaction_type, api_key=None, categories_list=None, remarks=None):
+        assert remarks == "Something"
+        return {"type": "Card", "amount": -12.5, "description": "SHOP", "account": "1234", "category": "shopping"}, None
+
+    def fail_categorize(*args, **kwargs):
+        raise AssertionError("categorize_transaction should not be called")
+
+    monkeypatch.setattr("src.llm_helper.llm_parse_bank_message", fake_llm_parse)
+    monkeypatch.setattr("src.parser.categorize_transaction", fail_categorize)
+
+    msg = "Unrecognised Bank Message,UOB,2025-12-28T15:57:31+08:00, Something"
+    result, status = parser.parse_message(msg)
+
+    assert result is not None
+    assert result.category == "shopping"
+    assert "Used LLM parsing" in status
+
+def test_keyword_category_precedence(parser):
+    keywords = {"food": ["dinner"], "transport": ["grab"], "snack": ["tea"]}
+    msg = "A transaction of SGD 15.00 was made with your UOB Card ending 9012 on 26/12/25 at GRAB TEA. If unauthorised, call 24/7 Fraud Hotline now,UOB,2025-12-28T15:57:31+08:00, Dinner"
+
+    # Remarks are checked before the description
+    result, _ = parser.parse_message(msg, keywords_map=keywords)
+    assert result.category == "food"
+
+    # Within one text, the first category in map order wins
+    result, _ = parser.parse_message(msg.replace(", Dinner", ", Later"), keywords_map=keywords)
+    assert result.category == "transport"
+
+def test_llm_category_not_shared_between_users(parser, monkeypatch):
+    class DictRules:
+        def __init__(self, rules):
+            self.rules = rules
+        def lookup(self, merchant, income):
+            return self.rules.get((merchant, income))
+        def record(self, merchant, income, category):
+            self.rules[(merchant, income)] = category
+
+    calls = []
+    def fake_categorize(message, categories_list=None, api_key=None):
+        calls.append(message)
+        return "food"
+    monkeypatch.setattr("src.parser.categorize_transaction", fake_categorize)
+
+    msg = "A transaction of SGD 6.50 was made with your UOB Card ending 9012 on 26/12/25 at STARBUCKS. If unauthorised, call 24/7 Fraud Hotline now,UOB,2025-12-28T15:57:31+08:00, "
+
+    # User A's LLM answer is recorded in A's rules only
+    user_a = DictRules({})
+    result, _ = parser.parse_message(msg, ["food", "snack"], {}, learned_rules=user_a)
+    assert result.category == "food"
+    assert user_a.rules == {("starbucks", False): "food"}
+
+    # User B keeps their own rule for the same merchant
+    user_b = DictRules({("starbucks", False): "snack"})
+    result, _ = parser.parse_message(msg, ["food", "snack"], {}, learned_rules=user_b)
+    assert result.category == "snack"
+    assert len(calls) == 1
+
+def test_learned_rules_checked_before_llm(parser, monkeypatch):
+    class FakeRules:
+        def __init__(self):
+            self.rules = {("jinjja chicken @ jewel", False): "snack"}
+            self.recorded = []
+        def lookup(self, merchant, income):
+            return self.rules.get((merchant, income))
+        def record(self, merchant, income, category):
+            self.recorded.append((merchant, income, category))
+
+    calls = []
+    def fake_categorize(message, categories_list=None, api_key=None):
+        calls.append(message)
+        return "food"
+    monkeypatch.setattr("src.parser.categorize_transaction", fake_categorize)
+
+    rules = FakeRules()
+    msg = "A transaction of SGD 15.00 was made with your UOB Card ending 9012 on 26/12/25 at {merchant}. If unauthorised, call 24/7 Fraud Hotline now,UOB,2025-12-28T15:57:31+08:00, "
+
+    result, _ = parser.parse_message(msg.format(merchant="JINJJA CHICKEN @ JEWEL"), ["food", "snack"], {}, learned_rules=rules)
+    assert result.category == "snack"
+    assert calls == []
+
+    result, _ = parser.parse_message(msg.format(merchant="NEW PLACE"), ["food", "snack"], {}, learned_rules=rules)
+    assert result.category == "food"
+    assert rules.recorded == [("new place", False, "food")]
+
+def test_parse_iso_timestamp_matches_isoparse():
+    from dateutil import parser as date_parser
+    from src.models import parse_iso_timestamp
+
+    # fromisoformat forms and dateutil-only forms (hour 24) parse the same
+    for ts in ["2025-12-28T15:57:31+08:00", "2025-12-28T15:57:31.123Z", "2025-12-28T24:00:00"]:
+        assert parse_iso_timestamp(ts) == date_parser.isoparse(ts)
+
+def test_type_mapping_first_key_wins():
+    # A raw type containing several keys maps by the first key in mapping order
+    uob = TransactionParser().bank_parsers["UOB"]
+    for raw_type, expected in [
+        ("card fund transfer", "Transfer"),
+        ("PayNow fund transfer", "Transfer"),
+        ("PayNow one-time transfer", "Transfer"),
+        ("Card PayNow transfer", "PayNow"),
+    ]:
+        msg = f"You made a {raw_type} of SGD 5.00 to KOPITIAM on your a/c ending 2222 at 12:01PM SGT, 5 Jan 26. If unauthorised, call UOB."
+        result = uob.rule_parse(msg)
+        assert result is not None
+        assert result.type == expected, raw_type
@@ -1,11 +1,18 @@
 import unittest
+import asyncio
 import tempfile
 import shutil
 import csv
+import io
 import copy
 from pathlib import Path
 from src.storage import StorageManager, FIELDNAMES
 from src.models import TransactionData
+from src.learned_rules import LearnedRules
+from api.db import SessionLocal
+from api.models import User, LearnedCategory
+from api.routers.transactions import update_transaction
+from api.schemas import TransactionUpdate
 
 class TestStorageManagerCommands(unittest.TestCase):
     def setUp(self):
@@ -80,18 +87,80 @@ class TestStorageManagerCommands(unittest.TestCase):
         self.assertEqual(len(txs), 2)
         
         # Export transactions
-        temp_path = self.storage.export_transactions(txs)
+        export_file = self.storage.export_transactions(txs)
         
-        # Verify file exists and content
-        self.assertTrue(Path(temp_path).exists())
-        with open(temp_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            self.assertEqual(len(rows), 2)
-            self.assertEqual(rows[0]['id'], 'test-id-1')
-            self.assertEqual(rows[1]['id'], 'test-id-2')
-
-        # Clean up temp file
-        Path(temp_path).unlink()
+        # Verify content
+        reader = csv.DictReader(io.StringIO(export_file.getvalue().decode('utf-8')))
+        rows = list(reader)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['id'], 'test-id-1')
+        self.assertEqual(rows[1]['id'], 'test-id-2')
+
+    def test_get_transactions_by_month(self):
+        tx2 = copy.deepcopy(self.transaction)
+        tx2.id = "test-id-jan"
+        tx2.timestamp = "2026-01-01T00:30:00"
+        self.storage.save_transaction(tx2, self.user_id)
+
+        dec_ids = [t.id for t in self.storage.get_transactions(self.user_id, year=2025, month=12)]
+        jan_ids = [t.id for t in self.storage.get_transactions(self.user_id, year=2026, month=1)]
+        self.assertIn("test-id-1", dec_ids)
+        self.assertNotIn("test-id-jan", dec_ids)
+        self.assertEqual(jan_ids, ["test-id-jan"])
+
+        self.storage.delete_transaction("test-id-jan", self.user_id)
+
+    def test_get_category_amounts(self):
+        amounts = self.storage.get_category_amounts(self.user_id, 2025, 12)
+        self.assertIn(("Food", -50.0), amounts)
+        self.assertEqual(self.storage.get_category_amounts(self.user_id, 2024, 12), [])
+
+    def test_learned_category_round_trip(self):
+        self.addCleanup(self._delete_learned_categories)
+        rules = LearnedRules(self.storage, self.user_id)
+        self.assertIsNone(rules.lookup("jinjja chicken", False))
+
+        rules.record("jinjja chicken", False, "food")
+        self.assertEqual(rules.lookup("jinjja chicken", False), "food")
+        self.assertIsNone(rules.lookup("jinjja chicken", True))
+
+        # Re-recording replaces the category
+        rules.record("jinjja chicken", False, "snack")
+        self.assertEqual(rules.lookup("jinjja chicken", False), "snack")
+
+    def test_category_edit_replaces_learned_rule(self):
+        self.addCleanup(self._delete_learned_categories)
+        rules = LearnedRules(self.storage, self.user_id)
+        # Provisional rule from an LLM answer
+        rules.record("test transaction", False, "food")
+
+        with SessionLocal() as db:
+            user = db.query(User).filter(User.telegram_id == self.user_id).first()
+        asyncio.run(update_transaction("test-id-1", TransactionUpdate(category="transport"), current_user=user))
+
+        self.assertEqual(rules.lookup("test transaction", False), "transport")
+
+    def _delete_learned_categories(self):
+        with SessionLocal() as db:
+            user = db.query(User).filter(User.telegram_id == self.user_id).first()
+            db.query(LearnedCategory).filter(LearnedCategory.user_id == user.id).delete()
+            db.commit()
+
+    def test_edit_config(self):
+        with self.storage.edit_config(self.user_id) as config:
+            config["tracking_items"] = [{"id": "t1", "name": "Coffee"}]
+            config["budgets"]["food"] = 123.0
+        config = self.storage.get_user_config(self.user_id)
+        self.assertEqual(config["tracking_items"], [{"id": "t1", "name": "Coffee"}])
+        self.assertEqual(config["budgets"]["food"], 123.0)
+
+        # An error inside the block discards the edits
+        with self.assertRaises(ValueError):
+            with self.storage.edit_config(self.user_id) as config:
+                config["tracking_items"] = []
+                raise ValueError("abort")
+        config = self.storage.get_user_config(self.user_id)
+        self.assertEqual(config["tracking_items"], [{"id": "t1", "name": "Coffee"}])
+
 if __name__ == '__main__':
     unittest.main()